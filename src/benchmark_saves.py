@@ -0,0 +1,72 @@
+"""report the size and encode / decode throughput of every saved chunk encoding
+for generated worlds: python benchmark_saves.py [world size in chunks]"""
+
+import pickle
+import random
+import time
+from sys import argv
+from typing import Callable
+
+import numpy as np
+
+from maths.constants import CHUNK_SIZE
+from model import ChunkSource, DefaultWorldGenerationConfig, Model
+from model.modelprotocol import ChunkSourceProtocol
+from model.savefile import COMPRESSIONS, KIND_IDS, decode_chunk, encode_chunk
+from model.worldgenconfig import HighFlatLandConfig
+
+# bytes of a chunk as one 16 bit id per block, the baseline of the ratios
+RAW_BYTES = CHUNK_SIZE * 2
+
+def encode_ids(chunk: ChunkSourceProtocol) -> bytes:
+    "the payload region files held before palettes (still read, see decode_chunk)"
+    if chunk.uniform is not None:
+        return encode_chunk(chunk)
+    return bytes((KIND_IDS,)) + np.ascontiguousarray(chunk.as_array(), "<u2").tobytes()
+
+def encoders() -> dict[str, Callable[[ChunkSourceProtocol], bytes]]:
+    encodings = {"ids": encode_ids}
+    for compression in COMPRESSIONS:
+        encodings[f"palette {compression}"] = lambda chunk, compression=compression: encode_chunk(chunk, compression=compression)
+    return encodings
+
+def generate(config_type: type, size: int) -> list[ChunkSourceProtocol]:
+    "return the chunks of a world generated with config_type, size x size chunks"
+    config = config_type()
+    config.dims = size, size
+    random.seed(0)
+    model = Model()
+    model.generate(config)
+    return list(model.model.values())
+
+def timed(function: Callable, items: list) -> tuple[list, float]:
+    begun = time.perf_counter()
+    results = [function(item) for item in items]
+    return results, time.perf_counter() - begun
+
+def report(name: str, chunks: list[ChunkSourceProtocol]):
+    raw = RAW_BYTES * len(chunks)
+    mixed = [chunk for chunk in chunks if chunk.uniform is None]
+    distinct = [len(np.unique(chunk.as_array())) for chunk in mixed]
+    print(f"\n{name}: {len(chunks)} chunks, {len(mixed)} mixed, "
+          f"block types per mixed chunk median {np.median(distinct):.0f} max {max(distinct, default=0)}")
+    print(f"{'encoding':<16}{'MB':>9}{'ratio':>9}{'encode MB/s':>14}{'decode MB/s':>14}")
+
+    legacy = {i: ChunkSource(chunk.get_blocks(), []) for i, chunk in enumerate(chunks)}
+    begun = time.perf_counter()
+    data = pickle.dumps(legacy)
+    encode = time.perf_counter() - begun
+    _, decode = timed(pickle.loads, [data])
+    print(f"{'pickle':<16}{len(data) / 2 ** 20:>9.2f}{raw / len(data):>9.1f}{raw / 2 ** 20 / encode:>14.0f}{raw / 2 ** 20 / decode:>14.0f}")
+
+    for encoding, encoder in encoders().items():
+        payloads, encode = timed(encoder, chunks)
+        decoded, decode = timed(decode_chunk, payloads)
+        assert all(np.array_equal(a.as_array(), b.as_array()) for a, b in zip(chunks, decoded))
+        size = sum(map(len, payloads))
+        print(f"{encoding:<16}{size / 2 ** 20:>9.2f}{raw / size:>9.1f}{raw / 2 ** 20 / encode:>14.0f}{raw / 2 ** 20 / decode:>14.0f}")
+
+if __name__ == "__main__":
+    size = int(argv[1]) if len(argv) > 1 else 16
+    for config_type in (DefaultWorldGenerationConfig, HighFlatLandConfig):
+        report(config_type.__name__, generate(config_type, size))
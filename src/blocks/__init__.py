@@ -1,7 +1,9 @@
 
 __all__ = [
-    "BlockProtocol", "DrawStyle", "blocks", "items"
+    "BlockProtocol", "DrawStyle", "BlockRegistry", "REGISTRY",
+    "blocks", "items", "registry"
 ]
 
 from .blockprotocol import BlockProtocol, DrawStyle
-from . import items, blocks
\ No newline at end of file
+from .registry import REGISTRY, BlockRegistry
+from . import items, blocks, registry
\ No newline at end of file
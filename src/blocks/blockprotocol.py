@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import ClassVar, Protocol
 
@@ -39,8 +39,13 @@ class DrawStyle(Enum):
     GRASS = 1
     FLUID = 2
 
-@dataclass
+@dataclass(eq=False)
 class BlockProtocol:
+    """Block type shared by every tile of that type
+
+    blocks compare by identity; registered blocks (see blocks.registry) carry
+    their integer block_id and name, and pickle as a reference to the registry
+    """
 
     transparent: bool
     passable: bool
@@ -49,6 +54,16 @@ class BlockProtocol:
     draw_style: DrawStyle
     drop_item: ItemProtocol | None
 
+    # set by BlockRegistry.register
+    block_id: int = field(default=-1, init=False, repr=False)
+    name: str = field(default="", init=False)
+
+    def __reduce__(self):
+        if self.block_id < 0:
+            return super().__reduce__()
+        from .registry import get_registered_block
+        return get_registered_block, (self.name,)
+
     @staticmethod
     def from_default(
             transparent: bool = False,
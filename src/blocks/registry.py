@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import astuple
+
+import numpy as np
+
+from .blockprotocol import BlockProtocol
+
+# block ids are stored as uint16 in chunk arrays; the last id is kept free
+# for the mesher's world edge marker (see model.mesher.MeshTables)
+MAX_BLOCKS = (1 << 16) - 1
+
+
+class BlockRegistry:
+    """Interns blocks and assigns each a stable small-integer id
+
+    ids are handed out in registration order and index every lookup table,
+    so REGISTRY.transparent[block.block_id] == block.transparent
+    registered blocks compare by identity and pickle by name, so loading a
+    save returns the registered singletons
+    """
+
+    blocks: list[BlockProtocol]
+    names: dict[str, BlockProtocol]
+
+    _tables: dict[str, np.ndarray]
+
+    def __init__(self):
+        self.blocks = []
+        self.names = {}
+        self._tables = {}
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __getitem__(self, block_id: int) -> BlockProtocol:
+        return self.blocks[block_id]
+
+    def register(self, name: str, block: BlockProtocol) -> BlockProtocol:
+        "assign block the next free id under name and return it"
+        if name in self.names:
+            raise ValueError(f"block {name} is already registered")
+        if block.block_id >= 0:
+            raise ValueError(f"{block} is already registered as {block.name}")
+        if len(self.blocks) >= MAX_BLOCKS:
+            raise ValueError(f"cannot register more than {MAX_BLOCKS} blocks")
+        block.block_id = len(self.blocks)
+        block.name = name
+        self.blocks.append(block)
+        self.names[name] = block
+        self._tables.clear()
+        return block
+
+    def by_name(self, name: str) -> BlockProtocol:
+        return self.names[name]
+
+    def id_of(self, block: BlockProtocol) -> int:
+        "return the id of block, interning unregistered copies first"
+        if block.block_id >= 0:
+            return block.block_id
+        return self.intern(block).block_id
+
+    def intern(self, block: BlockProtocol) -> BlockProtocol:
+        """return the registered block equal to block
+        used for blocks pickled before the registry existed, which come back as copies"""
+        if block.block_id >= 0:
+            return self.blocks[block.block_id]
+        key = _block_key(block)
+        for candidate in self.blocks:
+            if _block_key(candidate) == key:
+                return candidate
+        raise KeyError(f"{block} is not registered")
+
+    def _table(self, name: str, dtype, getter) -> np.ndarray:
+        table = self._tables.get(name)
+        if table is None:
+            table = np.array([getter(block) for block in self.blocks], dtype)
+            table.flags.writeable = False
+            self._tables[name] = table
+        return table
+
+    @property
+    def transparent(self) -> np.ndarray:
+        "bool array of BlockProtocol.transparent indexed by block id"
+        return self._table("transparent", np.bool_, lambda block: block.transparent)
+
+    @property
+    def passable(self) -> np.ndarray:
+        "bool array of BlockProtocol.passable indexed by block id"
+        return self._table("passable", np.bool_, lambda block: block.passable)
+
+    @property
+    def draw_style(self) -> np.ndarray:
+        "uint8 array of BlockProtocol.draw_style values indexed by block id"
+        return self._table("draw_style", np.uint8, lambda block: block.draw_style.value)
+
+def _block_key(block: BlockProtocol) -> tuple:
+    # drop items are instances without equality, compare by type
+    return (
+        block.transparent, block.passable,
+        None if block.textures is None else astuple(block.textures),
+        None if block.variants is None else [astuple(variant) for variant in block.variants],
+        block.draw_style, type(block.drop_item)
+        )
+
+REGISTRY = BlockRegistry()
+
+def get_registered_block(name: str) -> BlockProtocol:
+    "return the block registered under name (pickle hook for BlockProtocol)"
+    return REGISTRY.by_name(name)
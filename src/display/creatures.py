@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import ctypes
+from typing import Iterable
+
+import numpy as np
+from ai.creature import Creature
+from maths.culling import Frustum
+from pyglet import gl  # type: ignore
+
+from display.constants import UV_CREATURE
+
+# creature billboard: two crossed quads, each drawn both ways round so it shows
+# from every side despite back face culling; half width and half height
+_HALF_WIDTH, _HALF_HEIGHT = 0.4, 1.2
+# the billboard is centred this far above the creature's block
+_RAISE = 1.
+_QUADS = [
+    [1, 1, 1, -1, 1, -1, -1, -1, -1, 1, -1, 1],
+    [-1, 1, 1, 1, 1, -1, 1, -1, -1, -1, -1, 1],
+    [-1, 1, -1, 1, 1, 1, 1, -1, 1, -1, -1, -1],
+    [1, 1, -1, -1, 1, 1, -1, -1, 1, 1, -1, -1]
+    ]
+
+# shader attribute locations (see shaders/creature/vertex.glsl)
+_VERTEX, _OFFSET, _COLOUR, _UV = 0, 1, 3, 8
+
+INSTANCE_DTYPE = np.dtype([("position", np.float32, 3), ("colour", np.uint8, 4)])
+
+
+def billboard_mesh() -> np.ndarray:
+    "return the shared billboard mesh as rows of x, y, z, u, v (GL_QUADS)"
+    corners = np.array(_QUADS, np.float32).reshape(-1, 3) * (_HALF_WIDTH, _HALF_HEIGHT, _HALF_WIDTH)
+    corners[:, 1] += _RAISE
+    uvs = np.tile(np.array(UV_CREATURE, np.float32).reshape(4, 2), (len(_QUADS), 1))
+    return np.concatenate([corners, uvs], axis=1).astype(np.float32)
+
+
+class CreatureInstances:
+    """Every creature drawn as an instance of one shared billboard mesh
+
+    each creature owns a slot of a persistent instance array (position and
+    colour), written only when the creature is added, moves or is removed.
+    every frame the creatures inside the frustum are drawn with a single
+    instanced draw call; the gpu copy of the instances in view is only
+    rewritten when they, or the set of them in view, changed
+    """
+
+    instances: np.ndarray
+    _slots: dict[Creature, int]
+    _owners: list[Creature]
+    # instances currently on the gpu, by slot; None when they must be rewritten
+    _drawn: np.ndarray | None
+
+    def __init__(self, capacity: int = 64):
+        self.instances = np.zeros(capacity, INSTANCE_DTYPE)
+        self._slots = {}
+        self._owners = []
+        self._drawn = None
+        self._mesh = billboard_mesh()
+        self._gpu_capacity = 0
+
+        self._vao = gl.GLuint()
+        gl.glGenVertexArrays(1, ctypes.byref(self._vao))
+        self._mesh_buffer = gl.GLuint()
+        gl.glGenBuffers(1, ctypes.byref(self._mesh_buffer))
+        self._instance_buffer = gl.GLuint()
+        gl.glGenBuffers(1, ctypes.byref(self._instance_buffer))
+
+        gl.glBindVertexArray(self._vao)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self._mesh_buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, self._mesh.nbytes, self._mesh.ctypes.data, gl.GL_STATIC_DRAW)
+        stride = self._mesh.strides[0]
+        self._attribute(_VERTEX, 3, gl.GL_FLOAT, False, stride, 0)
+        self._attribute(_UV, 2, gl.GL_FLOAT, False, stride, 12)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self._instance_buffer)
+        stride = INSTANCE_DTYPE.itemsize
+        self._attribute(_OFFSET, 3, gl.GL_FLOAT, False, stride, INSTANCE_DTYPE.fields["position"][1], divisor=1)
+        self._attribute(_COLOUR, 4, gl.GL_UNSIGNED_BYTE, True, stride, INSTANCE_DTYPE.fields["colour"][1], divisor=1)
+        # pyglet draws from client state outside any vertex array object
+        gl.glBindVertexArray(0)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    @staticmethod
+    def _attribute(location: int, size: int, type_: int, normalised: bool, stride: int, offset: int, divisor: int = 0):
+        gl.glEnableVertexAttribArray(location)
+        gl.glVertexAttribPointer(location, size, type_, normalised, stride, offset)
+        if divisor:
+            gl.glVertexAttribDivisor(location, divisor)
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def __contains__(self, creature: Creature) -> bool:
+        return creature in self._slots
+
+    def add(self, creature: Creature):
+        "give creature a slot, growing the instance array when it is full"
+        if creature in self._slots:
+            return
+        slot = len(self._owners)
+        if slot == len(self.instances):
+            grown = np.zeros(len(self.instances) * 2, INSTANCE_DTYPE)
+            grown[:slot] = self.instances
+            self.instances = grown
+        self._slots[creature] = slot
+        self._owners.append(creature)
+        self.instances["colour"][slot] = creature.colour[:4]
+        self.move(creature)
+
+    def remove(self, creature: Creature):
+        "free the slot of creature, moving the last creature into it"
+        slot = self._slots.pop(creature, None)
+        if slot is None:
+            return
+        last = self._owners.pop()
+        if last is not creature:
+            self._owners[slot] = last
+            self._slots[last] = slot
+            self.instances[slot] = self.instances[len(self._owners)]
+        self._drawn = None
+
+    def move(self, creature: Creature):
+        "write the current location of creature to its slot"
+        self.instances["position"][self._slots[creature]] = creature.loc
+        self._drawn = None
+
+    def sync(self, creatures: Iterable[Creature]):
+        "add and remove slots so that exactly creatures are drawn"
+        creatures = list(creatures)
+        current = set(creatures)
+        for creature in [creature for creature in self._owners if creature not in current]:
+            self.remove(creature)
+        for creature in creatures:
+            self.add(creature)
+
+    def visible(self, frustum: Frustum) -> np.ndarray:
+        "return the slots of the creatures whose billboard is inside frustum"
+        positions = self.instances["position"][:len(self._owners)].astype(np.float64)
+        extent = np.array([_HALF_WIDTH, _HALF_HEIGHT, _HALF_WIDTH])
+        centres = positions + (0., _RAISE, 0.)
+        return np.nonzero(frustum.intersects_boxes(centres - extent, centres + extent))[0]
+
+    def draw(self, frustum: Frustum):
+        "draw the creatures inside frustum (the creature shader must be in use)"
+        if not self._owners:
+            return
+        visible = self.visible(frustum)
+        if not len(visible):
+            return
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self._instance_buffer)
+        if self._drawn is None or not np.array_equal(visible, self._drawn):
+            data = np.ascontiguousarray(self.instances[visible])
+            if len(visible) > self._gpu_capacity:
+                self._gpu_capacity = len(self.instances)
+                gl.glBufferData(gl.GL_ARRAY_BUFFER, self._gpu_capacity * INSTANCE_DTYPE.itemsize, None, gl.GL_DYNAMIC_DRAW)
+            gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, data.nbytes, data.ctypes.data)
+            self._drawn = visible
+        gl.glBindVertexArray(self._vao)
+        gl.glDrawArraysInstanced(gl.GL_QUADS, 0, len(self._mesh), len(visible))
+        gl.glBindVertexArray(0)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        gl.glDeleteBuffers(1, ctypes.byref(self._mesh_buffer))
+        gl.glDeleteBuffers(1, ctypes.byref(self._instance_buffer))
+        gl.glDeleteVertexArrays(1, ctypes.byref(self._vao))
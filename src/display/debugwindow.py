@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import time
+from collections import Counter
 from configparser import ConfigParser
 from math import cos, radians, sin
 
@@ -10,21 +11,29 @@ import model
 import pyglet  # type: ignore
 import pyshaders  # type: ignore
 from blocks.blocks import AIR, LOG, WATER
-from maths import get_raycast_discrete_block_hits
-from maths.constants import Colour
+from maths import Frustum, get_raycast_discrete_block_hits, visible_chunks
+from maths.constants import (CHUNK_RADIUS, GREEDY_MESHING, PACKED_VERTICES,
+                             Colour)
+from maths.types import ChunkLocation
+from model.mesher import packed_shader_defines
 from pyglet import clock  # type: ignore
-from pyglet import gl, graphics, shapes
+from pyglet import gl, shapes
 from pyglet.window import key, mouse  # type: ignore
 
 from display import glc
-from display.constants import UV_CREATURE  # type: ignore
 
+from .creatures import CreatureInstances
 from .shaders import load_shader
 
 # pyshaders transposes matrices passed to uniforms by default
 pyshaders.transpose_matrices(False)
 
-block_shader = load_shader("block")
+if PACKED_VERTICES:
+    block_shader = load_shader("block", packed_shader_defines())
+else:
+    block_shader = load_shader("block", ("GREEDY_MESHING",) if GREEDY_MESHING else ())
+# coarse terrain (see model.lod) always uses the plain vertex format
+lod_shader = block_shader if not (PACKED_VERTICES or GREEDY_MESHING) else load_shader("block")
 water_shader = load_shader("water")
 creature_shader = load_shader("creature")
 
@@ -32,6 +41,9 @@ config = ConfigParser()
 with open("./displaysettings.ini", "r") as config_file:
     config.read_file(config_file)
 
+# regions with more than this share of their chunks seen are drawn whole (see split_occluded)
+WHOLE_REGION_SHARE = .5
+
 LIGHT_SOURCE = [config.getfloat("SCENE", f"LightSource{n}", fallback=0.57735) for n in "XYZ"]
 
 class DebugWindow(pyglet.window.Window):
@@ -49,7 +61,13 @@ class DebugWindow(pyglet.window.Window):
     camera_speed: float = config.getfloat("DEBUG_WINDOW", "CameraSpeed")
     keys: set[int] = set()
     sensitivity: float = config.getfloat("DEBUG_WINDOW", "Sensitivity")
+    # skip chunks hidden behind closed chunks (see model.visibility)
+    occlusion_culling: bool = config.getboolean("DEBUG_WINDOW", "OcclusionCulling", fallback=False)
     creature_update_period: float = 1.
+    creature_instances: CreatureInstances
+    # region file save directory written by J, and by autosave once the world was loaded from or saved there (see Model.save)
+    save_path: str = "saves/live"
+    autosave: model.Autosave
 
     __water_rect: shapes.Rectangle
 
@@ -58,8 +76,12 @@ class DebugWindow(pyglet.window.Window):
         super(DebugWindow, self).__init__(*args, **kwargs)
 
         self.model = model.Model()
+        self.creature_instances = CreatureInstances()
+        self.autosave = model.Autosave(self.model, self.save_path, report=print)
 
         clock.schedule(self.update)
+        clock.schedule(self.autosave.update)
+        clock.schedule(self.update_meshes)
         clock.schedule_interval(self.creature_update, self.creature_update_period)
 
         self.__water_rect = shapes.Rectangle(0, 0, *self.get_size(), color=(0, 75, 180))
@@ -79,8 +101,16 @@ class DebugWindow(pyglet.window.Window):
             self.set_exclusive_mouse(True)
         elif symbol == key.U:
             self.set_exclusive_mouse(False)
+        elif symbol == key.J:
+            # written in the background, at most one save at a time
+            self.autosave.start()
         self.keys.add(symbol)
 
+    def on_close(self):
+        # let a save being written finish
+        self.autosave.close()
+        super().on_close()
+
     def on_key_release(self, symbol, modifiers):
         if symbol in self.keys:
             self.keys.remove(symbol)
@@ -188,12 +218,48 @@ class DebugWindow(pyglet.window.Window):
 
         glc.set_3d()
 
-        self.model.batch.draw()
-
-        glc.set_3d_trans()
+        frustum = Frustum.from_matrix(mvp)
+        # regions in view, nearest first; far ones draw coarse terrain instead of their chunks
+        regions, far_regions = self.split_far_regions(self.model.regions.visible(frustum, self.camera_position))
+        # chunks seen through open chunk faces, nearest first (None draws every chunk in view)
+        reachable = self.model.reachable_chunks(self.camera_position, frustum) if self.occlusion_culling else None
+        # regions drawn whole with their batches and chunks drawn one by one, nearest first
+        batched, chunklocs = self.split_occluded(regions, frustum, reachable)
+        # keep the meshes in view resident and bring back evicted ones (see Model.enforce_mesh_budget);
+        # only reachable ones, as occluded chunks are not drawn and so would be evicted again
+        drawn = [chunkloc for region in batched for chunkloc in region.chunks] + chunklocs
+        self.model.mark_visible(drawn)
+        self.model.request_evicted(frustum, self.camera_position, self.model.lod_distance,
+                                   None if reachable is None else set(reachable))
+
+        # nearest first so hidden fragments fail the depth test early
+        for region in batched:
+            region.batch.draw()
+        if chunklocs:
+            self.model.group.set_state_recursive()
+            for chunkloc in chunklocs:
+                vertex_list = self.model.displayed[chunkloc]
+                if vertex_list is None:
+                    continue
+                if self.model.packed_vertices:
+                    cx, cy, cz = chunkloc
+                    block_shader.uniforms.chunk_origin = cx * CHUNK_RADIUS, cy * CHUNK_RADIUS, cz * CHUNK_RADIUS
+                vertex_list.draw(gl.GL_QUADS)
+            self.model.group.unset_state_recursive()
 
         block_shader.clear()
 
+        if far_regions:
+            lod_shader.use()
+            lod_shader.uniforms.texture_sampler = self.texture_id
+            lod_shader.uniforms.mvp = mvp
+            lod_shader.uniforms.lightdirection = n.x, n.y, n.z
+            for region in far_regions:
+                region.batch_lod.draw()
+            lod_shader.clear()
+
+        glc.set_3d_trans()
+
         water_shader.use()
 
         water_shader.uniforms.intime = time.time() - STARTTIME
@@ -201,51 +267,60 @@ class DebugWindow(pyglet.window.Window):
         water_shader.uniforms.mvp = mvp
         water_shader.uniforms.eye = self.camera_position
 
-        self.model.batch_fluid.draw()
+        # translucent, so furthest first
+        for region in reversed(batched):
+            region.batch_fluid.draw()
+        if chunklocs:
+            self.model.group.set_state_recursive()
+            for chunkloc in reversed(chunklocs):
+                vertex_list = self.model.displayed_fluid[chunkloc]
+                if vertex_list is not None:
+                    vertex_list.draw(gl.GL_QUADS)
+            self.model.group.unset_state_recursive()
 
         water_shader.clear()
 
         creature_shader.use()
 
         creature_shader.uniforms.mvp = mvp
-
-        x, y, z = 0, 0, 0
-
-        sidecount = 0
-        vertices = []
-        texture_data = []
-        colour_data = []
-
-        batch = graphics.Batch()
-
-        n, m = 1.2, 0.4
-
-        def draw(side, dirs, textures):
-            nonlocal sidecount
-            vertices.extend([x+dirs[0],y+dirs[1],z+dirs[2], x+dirs[3],y+dirs[4],z+dirs[5], x+dirs[6],y+dirs[7],z+dirs[8], x+dirs[9],y+dirs[10],z+dirs[11]])
-            texture_data.extend(textures)
-            colour_data.extend(side)
-            sidecount += 1
-
-        for creature_wrapper in self.model.creatures:
-            creature, _ = creature_wrapper.creature, creature_wrapper.script
-            x, y, z = creature.loc
-            y += 1
-            draw(creature.colour, [m, n, m, -m, n, -m, -m, -n, -m, m, -n, m], UV_CREATURE)
-            draw(creature.colour, [-m, n, m, m, n, -m, m, -n, -m, -m, -n, m], UV_CREATURE)
-            draw(creature.colour, [-m, n, -m, m, n, m, m, -n, m, -m, -n, -m], UV_CREATURE)
-            draw(creature.colour, [m, n, -m, -m, n, m, -m, -n, m, m, -n, -m], UV_CREATURE)
-
-        batch.add(sidecount * 4, 7, self.model.group, # type: ignore
-            ('v3f/static', vertices), 
-            ('t2f/static', texture_data),
-            ("c4B/static", colour_data))
-
-        batch.draw()
+        if len(self.creature_instances) != len(self.model.creatures):
+            self.creature_instances.sync(wrapper.creature for wrapper in self.model.creatures)
+        self.creature_instances.draw(frustum)
 
         creature_shader.clear()
         
 
+    def split_occluded(self, regions: list[model.Region], frustum: Frustum,
+                       reachable: list[ChunkLocation] | None) -> tuple[list[model.Region], list[ChunkLocation]]:
+        """split the near regions in view into those drawn whole and the chunks
+        drawn one by one: with occlusion culling (reachable not None), the
+        reachable chunks outside regions mostly reachable"""
+        if self.model.packed_vertices:
+            # packed vertices are relative to their chunk, so chunks are drawn one by one
+            if reachable is None:
+                reachable = visible_chunks(frustum, [chunkloc for region in regions for chunkloc in region.chunks], self.camera_position)
+            near = {chunkloc for region in regions for chunkloc in region.chunks}
+            return [], [chunkloc for chunkloc in reachable if chunkloc in near]
+        if reachable is None:
+            return regions, []
+        seen = Counter(self.model.regions.region_location(chunkloc) for chunkloc in reachable)
+        batched = [region for region in regions if seen[region.location] > len(region.chunks) * WHOLE_REGION_SHARE]
+        whole = {region.location for region in batched}
+        near = {region.location for region in regions}
+        chunklocs = [chunkloc for chunkloc in reachable
+                     if (location := self.model.regions.region_location(chunkloc)) in near and location not in whole]
+        return batched, chunklocs
+
+    def split_far_regions(self, regions: list[model.Region]) -> tuple[list[model.Region], list[model.Region]]:
+        "split regions into those drawn in full and those beyond Model.lod_distance"
+        lod_distance = self.model.lod_distance
+        if lod_distance <= 0:
+            return regions, []
+        near, far = [], []
+        for region in regions:
+            (far if region.distance(self.camera_position) > lod_distance else near).append(region)
+        return near, far
+
     def move_horiz(self, dt: float, direction: float):
         theta = direction + self.camera_rotation[0]
         ox = self.camera_speed * dt * cos(radians(theta))
@@ -263,7 +338,7 @@ class DebugWindow(pyglet.window.Window):
                 self.camera_position, 
                 self.camera_rotation):
             block = self.model.get_block(candidate)
-            if block != AIR:
+            if block is not AIR:
                 self.model.remove_block(candidate)
                 break
 
@@ -275,7 +350,7 @@ class DebugWindow(pyglet.window.Window):
                 self.camera_position, 
                 self.camera_rotation):
             block = self.model.get_block(candidate)
-            if block != AIR:
+            if block is not AIR:
                 if last is not None:
                     self.model.add_block(last, LOG)
                 break
@@ -289,7 +364,7 @@ class DebugWindow(pyglet.window.Window):
                 self.camera_position,
                 self.camera_rotation):
             block = self.model.get_block(candidate)
-            if block != AIR:
+            if block is not AIR:
                 print(candidate)
                 break
         #for candidate in get_raycast_discrete_block_hits(
@@ -319,18 +394,32 @@ class DebugWindow(pyglet.window.Window):
             self.move_verti(dt, 1)
         if key.C in self.keys:
             self.move_verti(dt, -1)
-        if key.J in self.keys:
-            b = self.model.serialise()
-            with open("saves/live.pickle", "wb") as file:
-                file.write(b)
+
+    def update_meshes(self, dt):
+        """start meshing queued chunks, nearest the camera first, within the frame
+        budget and upload finished meshes within the upload budget
+        then rebuild the coarse terrain of changed chunk columns and evict
+        meshes past the gpu memory budget"""
+        self.model.chunk_queue.set_focus(self.camera_position)
+        self.model.chunk_queue.run()
+        self.model.mesh_uploads.drain()
+        self.model.update_lods()
+        self.model.enforce_mesh_budget()
 
     def creature_update(self, dt):
         destroy = []
-        for creature_wrapper in self.model.creatures:
-            creature, script = creature_wrapper.creature, creature_wrapper.script
-            script()
-            if creature.clear():
-                destroy.append(creature_wrapper)
+        # edits made by every script this tick are remeshed once, at the end
+        with self.model.batch_edits():
+            for creature_wrapper in self.model.creatures:
+                creature, script = creature_wrapper.creature, creature_wrapper.script
+                loc = creature.loc
+                script()
+                if creature.clear():
+                    destroy.append(creature_wrapper)
+                elif creature.loc != loc and creature in self.creature_instances:
+                    # only creatures that moved are rewritten in the instance buffer
+                    self.creature_instances.move(creature)
         for creature_wrapper in destroy:
             self.model.creatures.remove(creature_wrapper)
+            self.creature_instances.remove(creature_wrapper.creature)
 
@@ -1,11 +1,20 @@
 
 
-from pyshaders import ShaderProgram, from_files_names  # type: ignore
+from pyshaders import ShaderProgram, from_string  # type: ignore
 
 
-def load_shader(name: str) -> ShaderProgram:
-    "get shaders from shaders/<name>/<shader>"
-    return from_files_names(f"shaders/{name}/vertex.glsl", f"shaders/{name}/fragment.glsl")
+def load_shader(name: str, defines: tuple[str, ...] = ()) -> ShaderProgram:
+    """get shaders from shaders/<name>/<shader>
+    each of defines is #define'd after the #version line of both shaders"""
+    sources = []
+    for shader in ("vertex", "fragment"):
+        with open(f"shaders/{name}/{shader}.glsl", "r") as file:
+            source = file.read()
+        if defines:
+            version, _, body = source.partition("\n")
+            source = "\n".join([version, *(f"#define {define}" for define in defines), body])
+        sources.append(source)
+    return from_string(*sources)
 
 
 
@@ -13,6 +13,7 @@ from creatureapi import ModelAPIProtocol, create_model_api
 from display import DebugWindow
 from maths import DIRECTIONS
 from model import CreatureWrapper, DefaultWorldGenerationConfig
+from model.savefile import recover_save
 from model.worldgenconfig import HighFlatLandConfig
 
 def generate_ai_script(
@@ -37,7 +38,7 @@ def apple_picker(model_api: ModelAPIProtocol):
     model_api.try_walk(direction)
     for tileloc in search_sphere:
         block = model_api.get_block(tileloc)
-        if block == APPLE_LEAVES:
+        if block is APPLE_LEAVES:
             model_api.try_mine(tileloc)
     #if random.randint(1, 5) == 5:
     #    print(model_api.get_inventory())
@@ -50,7 +51,10 @@ def instance(world_generation: bool):
     config = DefaultWorldGenerationConfig()
     if world_generation:
         window.model.generate(config)
+    elif recover_save(window.save_path):
+        window.model.load(window.save_path)
     else:
+        # saves from before region files
         with open("saves/live.pickle", "rb") as file:
             window.model.deserialise(file.read())
 
@@ -3,14 +3,16 @@ __all__ = [
     "tex_coord", "colour_data", "DIRECTIONS",
     "get_sphere_blocks", "get_raycast_discrete_block_hits",
     "Direction", "Location", "Position",
-    "TextureGrid", "Velocity", "choice",
+    "TextureGrid", "Velocity", "choice", "choices",
     "xy_range", "xyz_range", "prob",
-    "random_rgb", "random_rgba", "Colour", "Vertex", "Normal"
+    "random_rgb", "random_rgba", "Colour", "Vertex", "Normal",
+    "Frustum", "chunk_bounds", "visible_boxes", "visible_chunks"
 ]
 
 from .blocks import get_raycast_discrete_block_hits, get_sphere_blocks
 from .bufferdomain import tex_coord
 from .constants import DIRECTIONS, Colour, Normal, Vertex
+from .culling import Frustum, chunk_bounds, visible_boxes, visible_chunks
 from .generators import xy_range, xyz_range
-from .rng import choice, prob, random_rgb, random_rgba
+from .rng import choice, choices, prob, random_rgb, random_rgba
 from .types import Direction, Location, Position, TextureGrid
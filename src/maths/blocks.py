@@ -65,6 +65,12 @@ def get_chunk_id(chunkloc: ChunkLocation) -> int:
         + (chunkloc[2] % CHUNK_BUFFER_RADIUS)
         )
 
+def get_chunk_location(chunk_id: int) -> ChunkLocation:
+    "return the ChunkLocation (within the chunk buffer) of a chunk_id; inverse of get_chunk_id"
+    cx, rem = divmod(chunk_id, CHUNK_BUFFER_AREA)
+    cy, cz = divmod(rem, CHUNK_BUFFER_RADIUS)
+    return cx, cy, cz
+
 @njit
 def get_chunk_id_xyz(x: int, y: int, z: int) -> int:
     "return corresponding chunk_id for a given set of positions on the axes"
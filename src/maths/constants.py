@@ -20,6 +20,34 @@ DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
 
 CHUNK_RADIUS: int = config.getint("MODEL", "ChunkSize", fallback=16)
 CHUNK_BUFFER_RADIUS: int = config.getint("MODEL", "ChunkBufferSize", fallback=128)
+# chunks along x and z of a region column sharing one batch (see model.regions)
+REGION_SIZE: int = config.getint("MODEL", "RegionSize", fallback=4)
+# chunks along each axis of one region file of a save (see model.savefile)
+SAVE_REGION_SIZE: int = config.getint("SAVE", "RegionSize", fallback=8)
+# compression of saved chunks: none, zlib or lzma (see model.savefile)
+SAVE_COMPRESSION: str = config.get("SAVE", "Compression", fallback="zlib")
+# seconds between autosaves (see model.autosave), 0 to disable
+SAVE_AUTOSAVE_INTERVAL: float = config.getfloat("SAVE", "AutosaveInterval", fallback=60.)
+
+# merge coplanar block faces into larger quads (see model.mesher)
+GREEDY_MESHING: bool = config.getboolean("MESH", "GreedyMeshing", fallback=False)
+# threads building chunk meshes in parallel (0 lets concurrent.futures pick)
+MESH_WORKERS: int = config.getint("MESH", "Workers", fallback=0)
+# milliseconds per frame spent remeshing queued chunks (see model.scheduler)
+MESH_FRAME_BUDGET: float = config.getfloat("MESH", "FrameBudget", fallback=4.)
+# edits touching at most this many cells of a chunk patch its mesh in place
+MESH_PATCH_LIMIT: int = config.getint("MESH", "PatchLimit", fallback=64)
+# draw block faces from 6 byte packed vertices (see model.mesher.MeshData.packed)
+# packed vertices need one quad per cell, so greedy meshing turns them off
+PACKED_VERTICES: bool = config.getboolean("MESH", "PackedVertices", fallback=False) and not GREEDY_MESHING
+# regions further than this many blocks from the camera draw coarse terrain (0 never does, see model.lod)
+MESH_LOD_DISTANCE: float = config.getfloat("MESH", "LodDistance", fallback=160.)
+# blocks along x and z merged into one coarse terrain cell; divides ChunkSize
+MESH_LOD_SCALE: int = config.getint("MESH", "LodScale", fallback=4)
+# megabytes of chunk vertex data kept on the gpu, least recently seen chunks are evicted past it (0 keeps all)
+MESH_MEMORY_BUDGET: int = int(config.getfloat("MESH", "MemoryBudget", fallback=256.) * 1024 * 1024)
+# megabytes of finished chunk meshes uploaded to the gpu per frame (0 uploads all, see model.uploads)
+MESH_UPLOAD_BUDGET: int = int(config.getfloat("MESH", "UploadBudget", fallback=2.) * 1024 * 1024)
 
 CHUNK_AREA: int = CHUNK_RADIUS ** 2
 CHUNK_SIZE: int = CHUNK_RADIUS ** 3
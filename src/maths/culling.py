@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from maths.constants import CHUNK_RADIUS
+from maths.types import ChunkLocation
+
+
+class Frustum:
+    """View frustum as six inward facing planes (a, b, c, d)
+
+    a point p is inside a plane when a*px + b*py + c*pz + d >= 0
+    built from the combined projection * view * model matrix (see glc.get_mvp);
+    no gl state is touched, so it is usable headless
+    """
+
+    planes: np.ndarray
+
+    def __init__(self, planes: np.ndarray):
+        self.planes = np.asarray(planes, np.float64).reshape(6, 4)
+
+    @classmethod
+    def from_matrix(cls, mvp) -> Frustum:
+        "extract the clip planes of mvp (a glm.mat4 or a row major 4x4 array)"
+        m = np.array(mvp, np.float64).reshape(4, 4)
+        planes = np.stack([
+            m[3] + m[0], m[3] - m[0],  # left, right
+            m[3] + m[1], m[3] - m[1],  # bottom, top
+            m[3] + m[2], m[3] - m[2]   # near, far
+            ])
+        # normalise so plane distances are in world units
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        return cls(planes)
+
+    def contains_point(self, point: Sequence[float]) -> bool:
+        return bool(np.all(self.planes[:, :3] @ np.asarray(point, np.float64) + self.planes[:, 3] >= 0.))
+
+    def intersects_boxes(self, lows: np.ndarray, highs: np.ndarray) -> np.ndarray:
+        """return whether each axis aligned box (lows[i], highs[i]) is at least partly inside
+        conservative: boxes near a frustum corner may be reported visible when they are not"""
+        lows = np.asarray(lows, np.float64).reshape(-1, 3)
+        highs = np.asarray(highs, np.float64).reshape(-1, 3)
+        normals, offsets = self.planes[:, :3], self.planes[:, 3]
+        # the corner of each box furthest along each plane normal
+        corners = np.where(normals[None] >= 0., highs[:, None], lows[:, None])
+        distances = np.einsum("bpk,pk->bp", corners, normals) + offsets
+        return np.all(distances >= 0., axis=1)
+
+    def intersects_box(self, low: Sequence[float], high: Sequence[float]) -> bool:
+        return bool(self.intersects_boxes(np.asarray(low), np.asarray(high))[0])
+
+
+def chunk_bounds(chunklocs: Sequence[ChunkLocation]) -> tuple[np.ndarray, np.ndarray]:
+    """return the world space (lows, highs) corners of every chunk in chunklocs
+    blocks are centred on integer coordinates, so chunks start half a block below theirs"""
+    lows = np.array(chunklocs, np.float64).reshape(-1, 3) * CHUNK_RADIUS - .5
+    return lows, lows + CHUNK_RADIUS
+
+def visible_boxes(frustum: Frustum, lows: np.ndarray, highs: np.ndarray, eye: Sequence[float]) -> np.ndarray:
+    "return the indices of the boxes (lows[i], highs[i]) inside frustum, nearest eye (front) first"
+    visible = np.nonzero(frustum.intersects_boxes(lows, highs))[0]
+    centres = (lows[visible] + highs[visible]) / 2.
+    distances = np.sum((centres - np.asarray(eye, np.float64)) ** 2, axis=1)
+    return visible[np.argsort(distances, kind="stable")]
+
+def visible_chunks(frustum: Frustum, chunklocs: Iterable[ChunkLocation], eye: Sequence[float]) -> list[ChunkLocation]:
+    "return the chunks of chunklocs inside frustum, nearest eye (front) first"
+    chunklocs = list(chunklocs)
+    if not chunklocs:
+        return []
+    lows, highs = chunk_bounds(chunklocs)
+    return [chunklocs[i] for i in visible_boxes(frustum, lows, highs, eye).tolist()]
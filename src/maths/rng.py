@@ -3,21 +3,56 @@
 import random
 from typing import TypeVar
 
+import numpy as np
+
 from .types import Location
 
 T = TypeVar("T")
 
+_MASK = (1 << 64) - 1
+# per-axis multipliers and the murmur3 64 bit finaliser constants
+_PRIMES = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9)
+_FMIX = (0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53)
+
 def prob(chance: float) -> bool:
     "shorthand for random.random() < chance"
     return random.random() < chance
 
+def position_hash(loc: Location) -> int:
+    "return a well mixed 64 bit hash of a tile location (matches position_hashes)"
+    h = (int(loc[0]) * _PRIMES[0] + int(loc[1]) * _PRIMES[1] + int(loc[2]) * _PRIMES[2]) & _MASK
+    h ^= h >> 33
+    h = (h * _FMIX[0]) & _MASK
+    h ^= h >> 33
+    h = (h * _FMIX[1]) & _MASK
+    h ^= h >> 33
+    return h
+
+def position_hashes(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    "vectorised position_hash over broadcastable integer coordinate arrays (uint64)"
+    shift = np.uint64(33)
+    # uint64 arithmetic wraps, like the masking in position_hash
+    with np.errstate(over="ignore"):
+        h = (np.asarray(x).astype(np.uint64) * np.uint64(_PRIMES[0])
+             + np.asarray(y).astype(np.uint64) * np.uint64(_PRIMES[1])
+             + np.asarray(z).astype(np.uint64) * np.uint64(_PRIMES[2]))
+        h ^= h >> shift
+        h *= np.uint64(_FMIX[0])
+        h ^= h >> shift
+        h *= np.uint64(_FMIX[1])
+        h ^= h >> shift
+    return h
+
 def choice(seq: list[T], loc: Location) -> T:
-    "return seeded random.choice (uses tile location as a seed)"
-    r = random.getstate()
-    random.seed((loc[0] * 83) + (loc[1] * 41) + (loc[2] * 23))
-    choice = random.choice(seq)
-    random.setstate(r)
-    return choice
+    """return an element of seq picked by the tile location
+    stateless: the same location always picks the same index and the global
+    random state is left alone, so it is safe from any thread"""
+    return seq[position_hash(loc) % len(seq)]
+
+def choices(counts: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """vectorised choice: the index choice(range(count), (x, y, z)) would pick
+    for every element of the broadcast arrays"""
+    return (position_hashes(x, y, z) % np.asarray(counts).astype(np.uint64)).astype(np.int64)
 
 def random_rgb() -> tuple[int, int, int]:
     "return random rgb colour"
@@ -22,11 +22,11 @@ Location = tuple[int, int, int]
 # Chunk is a list of 16 * 16 * 16 (4096) Blocks
 # Position 0, 0, 0 is index 0
 # Position x, y, z is index x * 256 + y * 16 + z
+# ArrayChunkSource stores the same layout as a uint16 array of block ids, ids[x, y, z]
 
 ChunkLocation = tuple[int, int, int]
 
 # Model
 
-# Model is a list of 64 * 64 * 64 (262 144) chunks
-# Chunk Position 0, 0, 0 is index 0
-# Chunk Position x, y, z is index (x % 64) * 4096 + (y % 64) * 64 + (z % 64)
+# Model is a ChunkIndex (sparse map) of ChunkLocation to chunk, holding only resident chunks
+# Chunk locations are unbounded; get_chunk_id's wrapped index is only used by older saves
@@ -1,9 +1,14 @@
 __all__ = [
-    "CreatureWrapper", "Model", "ChunkLocation", 
-    "ChunkSource", "ModelProtocol"
+    "Autosave", "SaveReport", "CreatureWrapper", "Model", "ChunkLocation", 
+    "ChunkSource", "ArrayChunkSource", "ChunkSourceProtocol", "ModelProtocol",
+    "MeshScheduler", "Region", "RegionIndex"
 ]
 
+from .autosave import Autosave, SaveReport
 from .model import CreatureWrapper, Model
-from .modelprotocol import ChunkLocation, ChunkSource, ModelProtocol
+from .modelprotocol import (ArrayChunkSource, ChunkLocation, ChunkSource,
+                            ChunkSourceProtocol, ModelProtocol)
+from .regions import Region, RegionIndex
+from .scheduler import MeshScheduler
 from .worldgenconfig import (DefaultWorldGenerationConfig,
                              WorldGenerationConfigProtocol)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from maths.constants import SAVE_AUTOSAVE_INTERVAL
+
+from model.model import Model
+from model.savefile import SaveSnapshot, WorldSave
+
+
+@dataclass
+class SaveReport:
+    "what one save wrote and how long it took"
+    path: str
+    chunks: int
+    bytes: int
+    # spent writing on the worker thread
+    seconds: float
+    # spent taking the snapshot on the main thread
+    snapshot_seconds: float
+    full: bool
+    # why the save failed, its chunks are saved again by the next one
+    error: Exception | None = None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"failed to save {self.path}: {self.error!r}"
+        kind = "saved world" if self.full else "saved"
+        return (f"{kind} {self.path}: {self.chunks} chunks, {self.bytes / 1024:.1f} KB in "
+                f"{self.seconds * 1000:.1f} ms (snapshot {self.snapshot_seconds * 1000:.2f} ms)")
+
+
+class Autosave:
+    """Saves a model every interval seconds without blocking the main thread
+
+    the main thread only takes a snapshot of the chunks to write (see
+    Model.begin_save), whose chunks the model copies before editing them;
+    encoding and file io run on a worker thread. update (called every frame)
+    starts saves when due and finishes them once written. one save runs at a time
+
+    saves are only due while the model's world was loaded from or saved to path
+    (see attached), so a freshly generated world never overwrites the save
+    there until start is called; failed saves are reported, not raised
+    """
+
+    model: Model
+    path: str
+    # seconds between saves, 0 to save only when start is called
+    interval: float
+    report: Callable[[SaveReport], None] | None
+    last_report: SaveReport | None
+    _running: tuple[SaveSnapshot, Future, float] | None
+    _elapsed: float
+
+    def __init__(self, model: Model, path: str, interval: float = SAVE_AUTOSAVE_INTERVAL, report: Callable[[SaveReport], None] | None = None):
+        self.model = model
+        self.path = path
+        self.interval = interval
+        self.report = report
+        self.last_report = None
+        self._running = None
+        self._elapsed = 0.
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="autosave")
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None
+
+    @property
+    def attached(self) -> bool:
+        "whether the model's world was loaded from or last saved to path"
+        world_save = self.model.world_save
+        return world_save is not None and os.path.abspath(world_save.path) == os.path.abspath(self.path)
+
+    def update(self, dt: float):
+        "finish a written save and start the next one when due"
+        self.poll()
+        if not self.attached:
+            # the save at path belongs to another world
+            self._elapsed = 0.
+            return
+        self._elapsed += dt
+        if self.interval > 0 and self._elapsed >= self.interval:
+            self.start()
+
+    def start(self) -> bool:
+        """start a save now unless one is running, return whether one was started
+        once written the model is attached to path, so later saves are due there too"""
+        if self._running is not None:
+            return False
+        self._elapsed = 0.
+        begun = time.perf_counter()
+        snapshot = self.model.begin_save(self.path)
+        snapshot_seconds = time.perf_counter() - begun
+        self._running = snapshot, self._executor.submit(self._write, snapshot), snapshot_seconds
+        return True
+
+    @staticmethod
+    def _write(snapshot: SaveSnapshot) -> tuple[WorldSave, int, float]:
+        begun = time.perf_counter()
+        world_save, written = snapshot.write()
+        return world_save, written, time.perf_counter() - begun
+
+    def poll(self) -> SaveReport | None:
+        "finish the running save if it was written, returning its report"
+        if self._running is None or not self._running[1].done():
+            return None
+        return self._finish()
+
+    def wait(self) -> SaveReport | None:
+        "wait for the running save, if any, and finish it"
+        if self._running is None:
+            return None
+        return self._finish()
+
+    def _finish(self) -> SaveReport:
+        snapshot, future, snapshot_seconds = self._running  # type: ignore
+        self._running = None
+        try:
+            world_save, written, seconds = future.result()
+        except Exception as error:
+            # its chunks stay unsaved and are saved again next time
+            self.model.end_save(snapshot, None)
+            self.last_report = SaveReport(snapshot.path, len(snapshot.chunks), 0, 0., snapshot_seconds, snapshot.full, error)
+            if self.report is not None:
+                self.report(self.last_report)
+            return self.last_report
+        self.model.end_save(snapshot, world_save)
+        self.last_report = SaveReport(snapshot.path, len(snapshot.chunks), written, seconds, snapshot_seconds, snapshot.full)
+        if self.report is not None and written:
+            self.report(self.last_report)
+        return self.last_report
+
+    def close(self):
+        "finish the running save and stop the worker thread"
+        self.wait()
+        self._executor.shutdown()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import (AbstractSet, Generic, ItemsView, Iterator, TypeVar,
+                    ValuesView)
+
+from maths.types import ChunkLocation
+
+T = TypeVar("T")
+
+
+class ChunkIndex(Generic[T]):
+    """Sparse map of ChunkLocation to T holding only resident chunks
+
+    coordinates are unbounded (no wrapping, unlike maths.blocks.get_chunk_id)
+    indexing an absent location returns None, like the preallocated lists this
+    replaces; assigning None removes the location
+    """
+
+    _chunks: dict[ChunkLocation, T]
+
+    def __init__(self, chunks: dict[ChunkLocation, T] | None = None):
+        self._chunks = {} if chunks is None else dict(chunks)
+
+    def __getitem__(self, chunkloc: ChunkLocation) -> T | None:
+        return self._chunks.get(chunkloc)
+
+    def peek(self, chunkloc: ChunkLocation) -> T | None:
+        "the value at chunkloc if it is in memory (indexes that read values on demand never read it)"
+        return self._chunks.get(chunkloc)
+
+    def __setitem__(self, chunkloc: ChunkLocation, value: T | None):
+        if value is None:
+            self._chunks.pop(chunkloc, None)
+        else:
+            self._chunks[chunkloc] = value
+
+    def __delitem__(self, chunkloc: ChunkLocation):
+        self._chunks.pop(chunkloc, None)
+
+    def __contains__(self, chunkloc: ChunkLocation) -> bool:
+        return chunkloc in self._chunks
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __iter__(self) -> Iterator[ChunkLocation]:
+        return iter(self._chunks)
+
+    def pop(self, chunkloc: ChunkLocation) -> T | None:
+        "remove and return the value at chunkloc (None if absent)"
+        return self._chunks.pop(chunkloc, None)
+
+    def locations(self) -> AbstractSet[ChunkLocation]:
+        "locations of every resident chunk"
+        return self._chunks.keys()
+
+    def values(self) -> ValuesView[T]:
+        return self._chunks.values()
+
+    def items(self) -> ItemsView[ChunkLocation, T]:
+        return self._chunks.items()
+
+    def clear(self):
+        self._chunks.clear()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+from blocks import DrawStyle
+from maths.constants import (CHUNK_RADIUS, MESH_LOD_SCALE, V_BACK, V_FRONT,
+                             V_LEFT, V_RIGHT, V_TABLE, V_UP)
+
+from model.mesher import MeshData, box_quads, get_mesh_tables
+from model.modelprotocol import ModelProtocol
+
+# x, z of a chunk column, in chunks
+ColumnLocation = tuple[int, int]
+
+# block faces are MESH_FACES ids in V_TABLE order
+_TOP = V_TABLE.index(V_UP)
+# side faces of a coarse cell: face id, neighbour step (x, z)
+_SIDES = [(V_TABLE.index(direction), (direction[0], direction[2])) for direction in (V_FRONT, V_BACK, V_LEFT, V_RIGHT)]
+
+
+def column_surface(model: ModelProtocol, column: ColumnLocation, cy_low: int, cy_high: int) -> tuple[np.ndarray, np.ndarray]:
+    """return the height and block id of the top surface block of every block column
+    of a chunk column, looking through chunks cy_high down to cy_low
+
+    surface blocks are drawn blocks and fluids (not foliage); heights are -1 where
+    there is none"""
+    r = CHUNK_RADIUS
+    tables = get_mesh_tables()
+    surface = tables.drawable & (tables.draw_style != DrawStyle.GRASS.value)
+    heights = np.full((r, r), -1, np.int64)
+    tops = np.zeros((r, r), np.int64)
+    cx, cz = column
+    for cy in range(cy_high, cy_low - 1, -1):
+        chunk = model.model[(cx, cy, cz)]
+        if chunk is None:
+            continue
+        missing = heights < 0
+        if not missing.any():
+            break
+        ids = chunk.as_array()
+        solid = surface[ids]
+        # highest surface cell of each block column (x, z) of the chunk
+        found = solid.any(axis=1) & missing
+        oy = r - 1 - np.argmax(solid[:, ::-1, :], axis=1)
+        xs, zs = np.nonzero(found)
+        heights[xs, zs] = cy * r + oy[xs, zs]
+        tops[xs, zs] = ids[xs, oy[xs, zs], zs]
+    return heights, tops
+
+def build_lod_mesh(
+        column: ColumnLocation,
+        heights: np.ndarray,
+        tops: np.ndarray,
+        floor: float,
+        walls: tuple[bool, bool, bool, bool] = (False, False, False, False),
+        scale: int = MESH_LOD_SCALE
+        ) -> MeshData:
+    """coarse mesh of a chunk column from its surface (see column_surface)
+
+    every scale x scale block columns become one box as high as the highest of
+    them, showing its top block; sides are only drawn down to lower neighbours,
+    or to floor at the edges of the chunk column unless that edge is a wall of
+    the world (walls: front, back, left, right, like the mesher culls them)"""
+    r = CHUNK_RADIUS
+    cells = r // scale
+    # highest block column of each coarse cell
+    blocks = heights.reshape(cells, scale, cells, scale).transpose(0, 2, 1, 3).reshape(cells, cells, -1)
+    highest = np.argmax(blocks, axis=2)
+    cell_heights = np.take_along_axis(blocks, highest[..., None], axis=2)[..., 0]
+    cell_tops = np.take_along_axis(
+        tops.reshape(cells, scale, cells, scale).transpose(0, 2, 1, 3).reshape(cells, cells, -1),
+        highest[..., None], axis=2)[..., 0]
+    xs, zs = np.nonzero(cell_heights >= 0)
+    if len(xs) == 0:
+        return MeshData.empty()
+
+    tables = get_mesh_tables()
+    # box corners in world space (blocks are centred on their coordinates)
+    x0 = column[0] * r + xs * scale - .5
+    z0 = column[1] * r + zs * scale - .5
+    tops_y = cell_heights[xs, zs] + .5
+    ids = cell_tops[xs, zs]
+
+    def boxes(bottoms: np.ndarray, keep: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        lows = np.stack([x0, bottoms, z0], axis=1)[keep]
+        highs = np.stack([x0 + scale, tops_y, z0 + scale], axis=1)[keep]
+        return lows, highs
+
+    lows, highs = boxes(tops_y, np.ones(len(xs), np.bool_))
+    meshes = [box_quads(lows, highs, _TOP, tables.textures[ids, 0, 0])]
+    padded = np.full((cells + 2, cells + 2), -np.inf)
+    padded[1:-1, 1:-1] = np.where(cell_heights >= 0, cell_heights + .5, -np.inf)
+    for (face_id, (dx, dz)), wall in zip(_SIDES, walls):
+        neighbours = padded[1 + dx:cells + 1 + dx, 1 + dz:cells + 1 + dz][xs, zs]
+        bottoms = np.where(np.isinf(neighbours), floor, neighbours)
+        keep = bottoms < tops_y
+        if wall:
+            keep &= ~np.isinf(neighbours)
+        lows, highs = boxes(bottoms, keep)
+        meshes.append(box_quads(lows, highs, face_id, tables.textures[ids[keep], 0, 2]))
+    return MeshData.concatenate(meshes)
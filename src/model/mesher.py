@@ -0,0 +1,557 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+from blocks import DrawStyle
+from blocks.blocks import AIR
+from blocks.registry import REGISTRY
+from maths.constants import (CHUNK_RADIUS, MESH_WORKERS, V_TABLE, Colour,
+                             Normal, Vertex)
+from maths.rng import choices
+from maths.types import ChunkLocation
+from numbawrapper import HAS_NUMBA, njit  # type: ignore
+
+from model.modelprotocol import ModelProtocol
+
+
+@dataclass
+class MeshData:
+    """Vertex arrays of one chunk mesh, four vertices per quad (GL_QUADS)
+
+    vertices    float32 (count, 3)
+    tex_coords  float32 (count, 2)
+    colours     uint8   (count, 4)
+    normals     float32 (count, 3)
+    tiles       float32 (count, 2) or None
+    cells       int32   (count // 4,) or None
+    faces       int32   (count // 4,) or None
+
+    cells holds the cell of the chunk (see maths.blocks.get_block_id) each quad
+    was emitted for, so the quads of a few cells can be replaced in place
+    (see Model.patch_chunk), and faces its index into MESH_FACES; merged
+    greedy quads span many cells and have neither
+
+    when tiles is set (greedy meshing) it holds the atlas origin of each
+    vertex's texture tile and tex_coords count tiles across the quad, so the
+    block shader can repeat the tile over merged faces
+    """
+
+    vertices: np.ndarray
+    tex_coords: np.ndarray
+    colours: np.ndarray
+    normals: np.ndarray
+    tiles: np.ndarray | None = None
+    cells: np.ndarray | None = None
+    faces: np.ndarray | None = None
+
+    @property
+    def count(self) -> int:
+        "number of vertices"
+        return len(self.vertices)
+
+    @staticmethod
+    def empty(tiled: bool = False) -> MeshData:
+        return MeshData(
+            np.empty((0, 3), np.float32),
+            np.empty((0, 2), np.float32),
+            np.empty((0, 4), np.uint8),
+            np.empty((0, 3), np.float32),
+            np.empty((0, 2), np.float32) if tiled else None,
+            None if tiled else np.empty(0, np.int32),
+            None if tiled else np.empty(0, np.int32)
+            )
+
+    @staticmethod
+    def concatenate(meshes: list[MeshData]) -> MeshData:
+        "join meshes (either all tiled or none)"
+        if not meshes:
+            return MeshData.empty()
+        return MeshData(
+            np.concatenate([mesh.vertices for mesh in meshes]),
+            np.concatenate([mesh.tex_coords for mesh in meshes]),
+            np.concatenate([mesh.colours for mesh in meshes]),
+            np.concatenate([mesh.normals for mesh in meshes]),
+            None if meshes[0].tiles is None else np.concatenate([mesh.tiles for mesh in meshes]),  # type: ignore
+            None if any(mesh.cells is None for mesh in meshes) else np.concatenate([mesh.cells for mesh in meshes]),  # type: ignore
+            None if any(mesh.faces is None for mesh in meshes) else np.concatenate([mesh.faces for mesh in meshes])  # type: ignore
+            )
+
+    def tiled(self) -> MeshData:
+        """return this mesh with tiles set, for meshes whose quads each
+        cover exactly one texture tile (see maths.bufferdomain.tex_coord)"""
+        if self.tiles is not None:
+            return self
+        quads = self.tex_coords.reshape(-1, 4, 2)
+        tiles = np.repeat(quads[:, 0, :], 4, axis=0)
+        tex_coords = np.broadcast_to(QUAD_TILE_CORNERS, quads.shape).reshape(-1, 2)
+        return MeshData(self.vertices, tex_coords, self.colours, self.normals, tiles, self.cells, self.faces)
+
+    def packed(self) -> tuple[np.ndarray, np.ndarray]:
+        """return the mesh in the packed vertex format of the block shader (PACKED_VERTICES)
+
+        corners  uint8 (count, 4): cell offset within the chunk, face id * 4 + corner
+        uvs      uint8 (count, 2): tex_coords in atlas tiles (see maths.bufferdomain.tex_coord)
+
+        vertex positions, colours and normals follow from the cell and face
+        (see packed_shader_defines); needs cells and faces, so not greedy meshes
+        """
+        r = CHUNK_RADIUS
+        cells = np.repeat(self.cells, 4)  # type: ignore
+        corners = np.empty((self.count, 4), np.uint8)
+        corners[:, 0], corners[:, 1], corners[:, 2] = cells // (r * r), cells // r % r, cells % r
+        corners[:, 3] = np.repeat(self.faces, 4) * 4 + np.tile(np.arange(4), len(self.faces))  # type: ignore
+        uvs = np.rint(self.tex_coords * ATLAS_TILES).astype(np.uint8)
+        return corners, uvs
+
+class MeshTables:
+    """Per block id lookup tables used by the mesher
+
+    textures[block_id, variant, slot] is the TextureGrid of a face, where slot
+    is 0 (top), 1 (bottom) or 2 (side); blocks without variants use variant 0
+
+    transparent has one extra entry, for the opaque edge id (size) that
+    _padded_ids puts past the world's outer walls so their faces are culled
+    """
+
+    size: int
+    edge: int
+    transparent: np.ndarray
+    draw_style: np.ndarray
+    drawable: np.ndarray
+    has_variants: np.ndarray
+    variant_counts: np.ndarray
+    textures: np.ndarray
+    tile_keys: np.ndarray
+
+    def __init__(self):
+        blocks = REGISTRY.blocks
+        self.size = len(blocks)
+        self.edge = self.size
+        self.transparent = np.append(REGISTRY.transparent, False)
+        self.draw_style = REGISTRY.draw_style
+        self.drawable = np.array([block.textures is not None or block.variants is not None for block in blocks], np.bool_)
+        self.has_variants = np.array([block.variants is not None for block in blocks], np.bool_)
+        self.variant_counts = np.array([1 if block.variants is None else len(block.variants) for block in blocks], np.int64)
+        self.textures = np.zeros((self.size, max(self.variant_counts), 3, 8), np.float32)
+        for block in blocks:
+            groups = block.variants if block.variants is not None else [block.textures]
+            for variant, group in enumerate(groups):
+                if group is not None:
+                    self.textures[block.block_id, variant] = group.top, group.bottom, group.side
+        # faces showing the same texture share a key, so greedy meshing can merge them
+        grids = self.textures.reshape(-1, 8)
+        _, keys = np.unique(grids, axis=0, return_inverse=True)
+        self.tile_keys = keys.reshape(self.textures.shape[:3])
+
+_tables: MeshTables | None = None
+
+def get_mesh_tables() -> MeshTables:
+    "return the mesh tables, rebuilt whenever blocks have been registered since"
+    global _tables
+    if _tables is None or _tables.size != len(REGISTRY):
+        _tables = MeshTables()
+    return _tables
+
+def _quad_array(values, dtype, width: int) -> np.ndarray:
+    return np.asarray(values, dtype).reshape(4, width)
+
+# tiles along each side of the texture atlas (see maths.bufferdomain.tex_coord)
+ATLAS_TILES = 16
+
+# tex_coord corners of a quad, in tiles
+QUAD_TILE_CORNERS = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], np.float32)
+
+# block faces: texture slot, vertex offsets, colour, normal
+TOP_FACE = (0, _quad_array(Vertex.TOP, np.float64, 3), _quad_array(Colour.TOP, np.uint8, 4), _quad_array(Normal.TOP, np.float32, 3))
+BOTTOM_FACE = (1, _quad_array(Vertex.BOT, np.float64, 3), _quad_array(Colour.BOTTOM, np.uint8, 4), _quad_array(Normal.BOTTOM, np.float32, 3))
+FRONT_FACE = (2, _quad_array(Vertex.FRONT, np.float64, 3), _quad_array(Colour.FRONT, np.uint8, 4), _quad_array(Normal.FRONT, np.float32, 3))
+BACK_FACE = (2, _quad_array(Vertex.BACK, np.float64, 3), _quad_array(Colour.BACK, np.uint8, 4), _quad_array(Normal.BACK, np.float32, 3))
+LEFT_FACE = (2, _quad_array(Vertex.LEFT, np.float64, 3), _quad_array(Colour.LEFT, np.uint8, 4), _quad_array(Normal.LEFT, np.float32, 3))
+RIGHT_FACE = (2, _quad_array(Vertex.RIGHT, np.float64, 3), _quad_array(Colour.RIGHT, np.uint8, 4), _quad_array(Normal.RIGHT, np.float32, 3))
+
+# DrawStyle.GRASS crossed quads
+_n, _m = 0.5, 0.4
+GRASS_FACES = [
+    (0, _quad_array(offsets, np.float64, 3), _quad_array(Colour.LEFT, np.uint8, 4), _quad_array(Normal.TOP, np.float32, 3))
+    for offsets in (
+        [_m, _n, _m, -_m, _n, -_m, -_m, -_n, -_m, _m, -_n, _m],
+        [-_m, _n, _m, _m, _n, -_m, _m, -_n, -_m, -_m, -_n, _m],
+        [-_m, _n, -_m, _m, _n, _m, _m, -_n, _m, -_m, -_n, -_m],
+        [_m, _n, -_m, -_m, _n, _m, -_m, -_n, _m, _m, -_n, -_m]
+        )
+    ]
+
+FLUID_FACE = (0, _quad_array(Vertex.TOP_FLUID, np.float64, 3), _quad_array(Colour.TOP, np.uint8, 4), _quad_array(Normal.TOP, np.float32, 3))
+
+# every face a mesh can hold, indexed by face id (MeshData.faces): block faces
+# in V_TABLE order, the grass quads and the fluid top
+MESH_FACES = [TOP_FACE, BOTTOM_FACE, FRONT_FACE, BACK_FACE, LEFT_FACE, RIGHT_FACE, *GRASS_FACES, FLUID_FACE]
+_FACE_SLOTS = np.array([face[0] for face in MESH_FACES], np.int64)
+_FACE_OFFSETS = np.stack([face[1] for face in MESH_FACES])
+_FACE_COLOURS = np.stack([face[2] for face in MESH_FACES])
+_FACE_NORMALS = np.stack([face[3] for face in MESH_FACES])
+_DIRECTIONS = np.array(V_TABLE, np.int64)
+_TOP, _BOTTOM, _FRONT, _BACK, _LEFT, _RIGHT = range(6)
+_GRASS_FACE = 6
+_FLUID_FACE = 10
+
+def box_quads(lows: np.ndarray, highs: np.ndarray, face_id: int, tex_coords: np.ndarray) -> MeshData:
+    """return the face_id block face (see MESH_FACES) of every box (lows[i], highs[i]),
+    stretched over the box, with the texture tex_coords[i] (TextureGrid)"""
+    offsets = _FACE_OFFSETS[face_id]
+    vertices = np.where(offsets[None] < 0, lows[:, None], highs[:, None]).astype(np.float32)
+    count = len(lows)
+    return MeshData(
+        vertices.reshape(-1, 3),
+        np.asarray(tex_coords, np.float32).reshape(-1, 2),
+        np.tile(_FACE_COLOURS[face_id], (count, 1)),
+        np.tile(_FACE_NORMALS[face_id], (count, 1)),
+        None,
+        None,
+        np.full(count, face_id, np.int32)
+        )
+
+def _emit(mask: np.ndarray, ids: np.ndarray, variants: np.ndarray, base: np.ndarray, face_id: int, tables: MeshTables) -> MeshData:
+    "build the quads of MESH_FACES[face_id] for every cell set in mask"
+    slot, offsets, colour, normal = MESH_FACES[face_id]
+    ox, oy, oz = np.nonzero(mask)
+    count = len(ox)
+    positions = np.stack((ox, oy, oz), axis=1) + base
+    return MeshData(
+        (positions[:, None, :] + offsets).astype(np.float32).reshape(-1, 3),
+        tables.textures[ids[ox, oy, oz], variants[ox, oy, oz], slot].reshape(-1, 2),
+        np.broadcast_to(colour, (count, 4, 4)).reshape(-1, 4),
+        np.broadcast_to(normal, (count, 4, 3)).reshape(-1, 3),
+        cells=((ox * CHUNK_RADIUS + oy) * CHUNK_RADIUS + oz).astype(np.int32),
+        faces=np.full(count, face_id, np.int32)
+        )
+
+def _greedy_rectangles(keys: np.ndarray) -> list[tuple[int, int, int, int, int]]:
+    """merge equal keys in each plane keys[s] into rectangles
+    return (s, a, b, size_a, size_b) per rectangle, where keys[s, a, b] is its
+    first cell; negative keys are empty cells"""
+    rectangles = []
+    for s in np.nonzero((keys >= 0).any(axis=(1, 2)))[0].tolist():
+        plane = keys[s].tolist()
+        rows, columns = len(plane), len(plane[0])
+        for a in range(rows):
+            row = plane[a]
+            b = 0
+            while b < columns:
+                key = row[b]
+                if key < 0:
+                    b += 1
+                    continue
+                width = 1
+                while b + width < columns and row[b + width] == key:
+                    width += 1
+                height = 1
+                while a + height < rows and all(k == key for k in plane[a + height][b:b + width]):
+                    height += 1
+                for covered in plane[a:a + height]:
+                    covered[b:b + width] = [-1] * width
+                rectangles.append((s, a, b, height, width))
+                b += width
+    return rectangles
+
+def _emit_greedy(mask: np.ndarray, ids: np.ndarray, variants: np.ndarray, base: np.ndarray, face_id: int, tables: MeshTables) -> MeshData:
+    "build merged quads of MESH_FACES[face_id] for the cells set in mask, one quad per rectangle of equal texture"
+    slot, offsets, colour, normal = MESH_FACES[face_id]
+    # quad corners 0 -> 1 run along the texture's u axis, 0 -> 3 along its v axis
+    axis_u = int(np.nonzero(offsets[1] != offsets[0])[0][0])
+    axis_v = int(np.nonzero(offsets[3] != offsets[0])[0][0])
+    axis_n = 3 - axis_u - axis_v
+
+    keys = np.where(mask, tables.tile_keys[ids, variants, slot], -1)
+    rectangles = _greedy_rectangles(keys.transpose(axis_n, axis_v, axis_u))
+    count = len(rectangles)
+    if count == 0:
+        return MeshData.empty(tiled=True)
+
+    rect = np.array(rectangles, np.int64).reshape(-1, 5)
+    cells = np.empty((count, 3), np.int64)
+    cells[:, axis_n], cells[:, axis_v], cells[:, axis_u] = rect[:, 0], rect[:, 1], rect[:, 2]
+    extents = np.ones((count, 3), np.int64)
+    extents[:, axis_v], extents[:, axis_u] = rect[:, 3], rect[:, 4]
+
+    # corners on the positive side of an axis move to the far cell of the rectangle
+    vertices = (cells + base)[:, None, :] + offsets + (offsets > 0) * (extents - 1)[:, None, :]
+    ox, oy, oz = cells.T
+    tiles = tables.textures[ids[ox, oy, oz], variants[ox, oy, oz], slot][:, :2]
+    sizes = np.stack((rect[:, 4], rect[:, 3]), axis=1)
+    return MeshData(
+        vertices.astype(np.float32).reshape(-1, 3),
+        (QUAD_TILE_CORNERS * sizes[:, None, :]).astype(np.float32).reshape(-1, 2),
+        np.broadcast_to(colour, (count, 4, 4)).reshape(-1, 4),
+        np.broadcast_to(normal, (count, 4, 3)).reshape(-1, 3),
+        np.repeat(tiles, 4, axis=0)
+        )
+
+_BLOCK_STYLE = DrawStyle.BLOCK.value
+_GRASS_STYLE = DrawStyle.GRASS.value
+_FLUID_STYLE = DrawStyle.FLUID.value
+
+@njit(nogil=True)
+def _write_quad(vertices, tex_coords, quad, x, y, z, offsets, grid):
+    for k in range(4):
+        vertices[quad * 4 + k, 0] = x + offsets[k, 0]
+        vertices[quad * 4 + k, 1] = y + offsets[k, 1]
+        vertices[quad * 4 + k, 2] = z + offsets[k, 2]
+        tex_coords[quad * 4 + k, 0] = grid[2 * k]
+        tex_coords[quad * 4 + k, 1] = grid[2 * k + 1]
+
+@njit(nogil=True)
+def _mesh_kernel(padded, selected, variants, base, transparent, draw_style, drawable, textures, slots, offsets, directions):
+    """mesh the selected cells of one chunk from its padded block ids (see _padded_ids)
+    returns solid vertices, tex_coords, face index (into MESH_FACES) and cell per quad
+    then fluid vertices, tex_coords and cell per quad"""
+    r = padded.shape[0] - 2
+    # faces of each cell: bits 0-5 block faces, 6 grass, 7 fluid
+    masks = np.zeros((r, r, r), np.uint8)
+    quads = 0
+    fluids = 0
+    for ox in range(r):
+        for oy in range(r):
+            for oz in range(r):
+                block_id = padded[ox + 1, oy + 1, oz + 1]
+                if not selected[ox, oy, oz] or not drawable[block_id]:
+                    continue
+                style = draw_style[block_id]
+                if style == _GRASS_STYLE:
+                    masks[ox, oy, oz] = 1 << _GRASS_FACE
+                    quads += 4
+                elif style == _FLUID_STYLE:
+                    above = padded[ox + 1, oy + 2, oz + 1]
+                    if transparent[above] and above != block_id:
+                        masks[ox, oy, oz] = 1 << 7
+                        fluids += 1
+                elif style == _BLOCK_STYLE:
+                    mask = 0
+                    for f in range(6):
+                        if not transparent[padded[ox + 1 + directions[f, 0], oy + 1 + directions[f, 1], oz + 1 + directions[f, 2]]]:
+                            continue
+                        mask |= 1 << f
+                        quads += 1
+                    masks[ox, oy, oz] = mask
+
+    vertices = np.empty((quads * 4, 3), np.float32)
+    tex_coords = np.empty((quads * 4, 2), np.float32)
+    faces = np.empty(quads, np.int32)
+    cells = np.empty(quads, np.int32)
+    fluid_vertices = np.empty((fluids * 4, 3), np.float32)
+    fluid_tex_coords = np.empty((fluids * 4, 2), np.float32)
+    fluid_cells = np.empty(fluids, np.int32)
+    quad = 0
+    fluid = 0
+    for ox in range(r):
+        for oy in range(r):
+            for oz in range(r):
+                mask = masks[ox, oy, oz]
+                if mask == 0:
+                    continue
+                block_id = padded[ox + 1, oy + 1, oz + 1]
+                variant = variants[ox, oy, oz]
+                x, y, z = base[0] + ox, base[1] + oy, base[2] + oz
+                cell = (ox * r + oy) * r + oz
+                if mask & (1 << 7):
+                    grid = textures[block_id, variant, slots[_FLUID_FACE]]
+                    _write_quad(fluid_vertices, fluid_tex_coords, fluid, x, y, z, offsets[_FLUID_FACE], grid)
+                    fluid_cells[fluid] = cell
+                    fluid += 1
+                    continue
+                if mask & (1 << _GRASS_FACE):
+                    for f in range(_GRASS_FACE, _GRASS_FACE + 4):
+                        _write_quad(vertices, tex_coords, quad, x, y, z, offsets[f], textures[block_id, variant, slots[f]])
+                        faces[quad] = f
+                        cells[quad] = cell
+                        quad += 1
+                    continue
+                for f in range(6):
+                    if mask & (1 << f):
+                        _write_quad(vertices, tex_coords, quad, x, y, z, offsets[f], textures[block_id, variant, slots[f]])
+                        faces[quad] = f
+                        cells[quad] = cell
+                        quad += 1
+    return vertices, tex_coords, faces, cells, fluid_vertices, fluid_tex_coords, fluid_cells
+
+_ALL_CELLS = np.ones((CHUNK_RADIUS, CHUNK_RADIUS, CHUNK_RADIUS), np.bool_)
+
+_buffers = threading.local()
+
+def _padded_ids(model: ModelProtocol, chunkloc: ChunkLocation, dims: tuple[int, int], edge: int) -> np.ndarray:
+    """return the chunk's block ids with a one cell halo holding the touching
+    layer of each face neighbour (air where the neighbour is missing, edge
+    past the world's outer walls)
+
+    the array is a buffer reused by the next call on the same thread"""
+    r = CHUNK_RADIUS
+    padded = getattr(_buffers, "padded", None)
+    if padded is None:
+        padded = _buffers.padded = np.full((r + 2, r + 2, r + 2), AIR.block_id, np.uint16)
+    padded[1:-1, 1:-1, 1:-1] = model.model[chunkloc].as_array()  # type: ignore
+
+    cx, cy, cz = chunkloc
+    # walls of the world, by V_TABLE direction (z is bounded by dims[0] like x)
+    walls = (False, cy == 0, cz == dims[0] - 1, cz == 0, cx == dims[0] - 1, cx == 0)
+    for direction, wall in zip(V_TABLE, walls):
+        axis = direction.index(1) if 1 in direction else direction.index(-1)
+        outward = direction[axis] > 0
+        border: list[slice | int] = [slice(1, -1)] * 3
+        border[axis] = -1 if outward else 0
+        neighbour = model.model[(cx + direction[0], cy + direction[1], cz + direction[2])]
+        if wall:
+            padded[tuple(border)] = edge
+        elif neighbour is None:
+            padded[tuple(border)] = AIR.block_id
+        elif neighbour.uniform is not None:
+            padded[tuple(border)] = neighbour.uniform
+        else:
+            padded[tuple(border)] = np.take(neighbour.as_array(), 0 if outward else r - 1, axis=axis)
+    return padded
+
+def _pick_variants(ids: np.ndarray, selected: np.ndarray, base: np.ndarray, tables: MeshTables) -> np.ndarray:
+    "return the texture variant of every selected cell (0 for blocks without variants)"
+    # picked by a hash of the block's world position, so remeshing keeps them
+    r = ids.shape[0]
+    counts = np.where(selected, tables.variant_counts[ids], 1)
+    return choices(
+        counts,
+        (base[0] + np.arange(r))[:, None, None],
+        (base[1] + np.arange(r))[None, :, None],
+        (base[2] + np.arange(r))[None, None, :]
+        )
+
+def build_chunk_mesh(
+        model: ModelProtocol, 
+        chunkloc: ChunkLocation, 
+        dims: tuple[int, int], 
+        greedy: bool = False,
+        selected: np.ndarray | None = None
+        ) -> tuple[MeshData, MeshData]:
+    """return the (solid, fluid) meshes of the chunk at chunkloc
+    or only of its cells set in selected (bool, shape CHUNK_SHAPE)
+
+    faces are culled against the transparency of neighbouring cells, all read
+    from one padded copy of the chunk whose halo holds the touching layer of
+    each neighbour chunk (see _padded_ids)
+
+    with numba installed the chunk is meshed by a compiled kernel that
+    releases the GIL, so build_chunk_meshes can run it on several threads;
+    otherwise (and for greedy meshing) whole-chunk numpy masks are used
+
+    with greedy set, coplanar DrawStyle.BLOCK faces showing the same tile are
+    merged into larger quads and the solid mesh is tiled (see MeshData)
+    """
+    tables = get_mesh_tables()
+    if model.model[chunkloc] is None:
+        return MeshData.empty(tiled=greedy), MeshData.empty()
+    padded = _padded_ids(model, chunkloc, dims, tables.edge)
+    ids = padded[1:-1, 1:-1, 1:-1]
+
+    r = CHUNK_RADIUS
+    cx, cy, cz = chunkloc
+    base = np.array((cx * r, cy * r, cz * r), np.int64)
+    if selected is None:
+        selected = _ALL_CELLS
+    variants = _pick_variants(ids, selected, base, tables)
+
+    if HAS_NUMBA and not greedy:
+        vertices, tex_coords, faces, cells, fluid_vertices, fluid_tex_coords, fluid_cells = _mesh_kernel(
+            padded, selected, variants, base, tables.transparent, tables.draw_style, tables.drawable,
+            tables.textures, _FACE_SLOTS, _FACE_OFFSETS, _DIRECTIONS
+            )
+        _, _, fluid_colour, fluid_normal = FLUID_FACE
+        return (
+            MeshData(
+                vertices, tex_coords, _FACE_COLOURS[faces].reshape(-1, 4), _FACE_NORMALS[faces].reshape(-1, 3),
+                cells=cells, faces=faces
+                ),
+            MeshData(
+                fluid_vertices, fluid_tex_coords,
+                np.broadcast_to(fluid_colour, (len(fluid_cells), 4, 4)).reshape(-1, 4),
+                np.broadcast_to(fluid_normal, (len(fluid_cells), 4, 3)).reshape(-1, 3),
+                cells=fluid_cells, faces=np.full(len(fluid_cells), _FLUID_FACE, np.int32)
+                )
+            )
+
+    transparent = tables.transparent[padded]
+    # ids of the cells above each block, used by fluids
+    above = padded[1:-1, 2:, 1:-1]
+
+    # neighbour transparency by face
+    top = transparent[1:-1, 2:, 1:-1]
+    bottom = transparent[1:-1, :-2, 1:-1]
+    front = transparent[1:-1, 1:-1, 2:]
+    back = transparent[1:-1, 1:-1, :-2]
+    left = transparent[2:, 1:-1, 1:-1]
+    right = transparent[:-2, 1:-1, 1:-1]
+
+    drawable = tables.drawable[ids] & selected
+    style = tables.draw_style[ids]
+
+    block = drawable & (style == DrawStyle.BLOCK.value)
+    emit_block = _emit_greedy if greedy else _emit
+    meshes = [
+        emit_block(block & top, ids, variants, base, _TOP, tables),
+        emit_block(block & bottom, ids, variants, base, _BOTTOM, tables),
+        emit_block(block & front, ids, variants, base, _FRONT, tables),
+        emit_block(block & back, ids, variants, base, _BACK, tables),
+        emit_block(block & left, ids, variants, base, _LEFT, tables),
+        emit_block(block & right, ids, variants, base, _RIGHT, tables),
+        ]
+    grass = drawable & (style == DrawStyle.GRASS.value)
+    if grass.any():
+        grass_meshes = (_emit(grass, ids, variants, base, face_id, tables) for face_id in range(_GRASS_FACE, _GRASS_FACE + 4))
+        meshes.extend(mesh.tiled() if greedy else mesh for mesh in grass_meshes)
+
+    fluid = drawable & (style == DrawStyle.FLUID.value) & top & (above != ids)
+    fluid_mesh = _emit(fluid, ids, variants, base, _FLUID_FACE, tables)
+
+    return MeshData.concatenate(meshes), fluid_mesh
+
+_pool: ThreadPoolExecutor | None = None
+
+def get_mesh_pool() -> ThreadPoolExecutor:
+    "return the thread pool shared by every build_chunk_meshes call"
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(MESH_WORKERS or None, thread_name_prefix="mesher")
+    return _pool
+
+def build_chunk_meshes(
+        model: ModelProtocol, 
+        chunklocs: Iterable[ChunkLocation], 
+        dims: tuple[int, int], 
+        greedy: bool = False
+        ) -> Iterator[tuple[ChunkLocation, MeshData, MeshData]]:
+    """build the meshes of many chunks in parallel on the mesh pool
+    yields (chunkloc, solid, fluid) in completion order; chunks must not be
+    edited until the iterator is exhausted"""
+    # build the tables here rather than racing to in every worker
+    get_mesh_tables()
+    pool = get_mesh_pool()
+    futures = {pool.submit(build_chunk_mesh, model, chunkloc, dims, greedy): chunkloc for chunkloc in chunklocs}
+    for future in as_completed(futures):
+        mesh, fluid_mesh = future.result()
+        yield futures.pop(future), mesh, fluid_mesh
+
+def _glsl_array(kind: str, rows: np.ndarray) -> str:
+    return ", ".join(f"{kind}({', '.join(repr(float(v)) for v in row)})" for row in rows)
+
+def packed_shader_defines() -> tuple[str, ...]:
+    """#defines of the block shader's PACKED_VERTICES mode: the per face id
+    corner offsets, colours and normals that packed vertices leave out"""
+    faces = len(MESH_FACES)
+    return (
+        "PACKED_VERTICES",
+        f"FACE_CORNERS {faces * 4}",
+        f"FACES {faces}",
+        f"ATLAS_TILES {float(ATLAS_TILES)}",
+        f"FACE_OFFSETS {_glsl_array('vec3', _FACE_OFFSETS.reshape(-1, 3))}",
+        f"FACE_COLOURS {_glsl_array('vec4', _FACE_COLOURS.reshape(-1, 4) / 255.)}",
+        f"FACE_NORMALS {_glsl_array('vec3', _FACE_NORMALS[:, 0])}",
+        )
@@ -1,30 +1,49 @@
 from __future__ import annotations
 
+import os
 import pickle
 import random
-from collections import deque
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable, Generator, TypeVar
+from math import floor
+from typing import Callable, Collection, Iterable, Iterator, Sequence, TypeVar
+
+import numpy as np
 
 from ai.creature import Creature  # type: ignore
 from blocks import BlockProtocol, DrawStyle
 from blocks.blocks import AIR, DIRT, GRASS, SAND, STONE, TALL_GRASS
+from blocks.registry import REGISTRY
 from display.constants import TEXTURE_PATH
-from maths import choice
-from maths.blocks import get_block_id_xyz, get_chunk_and_offsets, get_chunk_id
-from maths.constants import (CHUNK_BUFFER_SIZE, CHUNK_RADIUS, CHUNK_SIZE,
-                             Colour, Normal, Vertex)
-from maths.generators import xy_range, xyz_range
+from maths.blocks import (get_block_id_xyz, get_chunk_and_offsets,
+                          get_chunk_location)
+from maths.constants import (CHUNK_RADIUS, CHUNK_SIZE, GREEDY_MESHING,
+                             MESH_FRAME_BUDGET, MESH_LOD_DISTANCE,
+                             MESH_MEMORY_BUDGET, MESH_PATCH_LIMIT,
+                             PACKED_VERTICES, V_TABLE)
+from maths.culling import Frustum, visible_chunks
+from maths.generators import xy_range
 from maths.types import ChunkLocation, Location
 from pyglet import image  # type: ignore
-from pyglet.gl import GL_QUADS  # type: ignore
-from pyglet.graphics import Batch  # type: ignore
 from pyglet.graphics import TextureGroup  # type: ignore
 from pyglet.graphics.vertexdomain import VertexList  # type: ignore
 from tqdm import tqdm  # type: ignore
 
 import model.worldgen as worldgen
-from model.modelprotocol import ChunkSource, ModelProtocol
+from model.chunkindex import ChunkIndex
+from model.lod import ColumnLocation, build_lod_mesh, column_surface
+from model.mesher import MeshData, build_chunk_mesh, build_chunk_meshes
+from model.modelprotocol import (CHUNK_SHAPE, ArrayChunkSource, ChunkSource,
+                                 ChunkSourceProtocol, ModelProtocol)
+from model.regions import RegionIndex
+from model.savefile import SavedChunkIndex, SaveSnapshot, WorldSave
+from model.scheduler import MeshScheduler
+from model.uploads import MeshUploads
+from model.vertexlists import add_mesh, patch_vertex_list, vertex_list_bytes
+from model.visibility import (OPEN, chunk_connectivity, exit_faces,
+                              reachable_chunks)
 from model.worldgenconfig import WorldGenerationConfigProtocol
 
 from .worldgen import GenerateWorldResult
@@ -46,69 +65,179 @@ class Model(ModelProtocol):
     """
 
     creatures: list[CreatureWrapper]
-    chunk_queue: deque[Generator[None, None, None]]
-
-    batch: Batch
-    batch_fluid: Batch
+    chunk_queue: MeshScheduler
+    # meshes built off the main thread, uploaded a few per frame (see model.uploads)
+    mesh_uploads: MeshUploads
+    # dirty cells (see maths.blocks.get_block_id) by chunk, None when the whole chunk is dirty
+    dirty: dict[ChunkLocation, set[int] | None]
+    _edit_depth: int
+
+    # batches of the displayed chunks, by region (see model.regions)
+    regions: RegionIndex
     group: TextureGroup
-    model: list[None | ChunkSource]
-    displayed: list[None | VertexList]
-    displayed_fluid: list[None | VertexList]
+    model: ChunkIndex[ChunkSourceProtocol]
+    displayed: ChunkIndex[VertexList]
+    displayed_fluid: ChunkIndex[VertexList]
+    # cell of every quad in displayed / displayed_fluid, -1 for unused quads (see MeshData.cells)
+    displayed_cells: ChunkIndex[np.ndarray]
+    displayed_fluid_cells: ChunkIndex[np.ndarray]
+    # face connectivity masks of chunks (see model.visibility), dropped when a chunk is remeshed
+    connectivity: ChunkIndex[int]
+    _extent: tuple[int, ChunkLocation, ChunkLocation] | None
+    # (extent, connectivity masks, displayed or evicted) grids over chunk_extent for occlusion
+    # culling (see occlusion_grids); entries of the chunks in _occlusion_stale are out of date
+    _occlusion: tuple[tuple[ChunkLocation, ChunkLocation], np.ndarray, np.ndarray] | None
+    _occlusion_stale: set[ChunkLocation]
+    # chunk columns whose coarse terrain (see model.lod) is out of date
+    lod_stale: set[ColumnLocation]
+    # bytes of the vertex lists of every displayed chunk, least recently visible first
+    mesh_lru: OrderedDict[ChunkLocation, int]
+    mesh_bytes: int
+    # chunks whose display was evicted to keep within mesh_budget (see enforce_mesh_budget)
+    evicted: set[ChunkLocation]
+    # chunks drawn in the last frame, None before the first
+    _visible: set[ChunkLocation] | None
+    # the save last written or loaded, which save writes changed chunks back to
+    world_save: WorldSave | None
+    # chunks changed since world_save was last written
+    unsaved: set[ChunkLocation]
+    # the save begun and not yet ended, whose chunks are copied before being edited
+    _save_in_progress: SaveSnapshot | None
     dims: tuple[int, int]
 
     texturepath: str = TEXTURE_PATH
+    greedy_meshing: bool = GREEDY_MESHING
+    packed_vertices: bool = PACKED_VERTICES
+    lod_distance: float = MESH_LOD_DISTANCE
+    mesh_budget: int = MESH_MEMORY_BUDGET
 
     def __init__(self):
         self.creatures = []
-        self.chunk_queue = deque()
-        self.model = [None for _ in range(CHUNK_BUFFER_SIZE)]
-        self.batch = Batch()
-        self.batch_fluid = Batch()
+        self.mesh_uploads = MeshUploads(self.build_chunk_mesh, self.display_chunk)
+        self.chunk_queue = MeshScheduler(self.submit_chunks, ready=lambda: self.mesh_uploads.ready)
+        self.dirty = {}
+        self._edit_depth = 0
+        self.model = ChunkIndex()
+        self.regions = RegionIndex()
         self.group = TextureGroup(image.load(self.texturepath).get_texture())
-        self.displayed = [None for _ in range(CHUNK_BUFFER_SIZE)]
-        self.displayed_fluid = [None for _ in range(CHUNK_BUFFER_SIZE)]
+        self.displayed = ChunkIndex()
+        self.displayed_fluid = ChunkIndex()
+        self.displayed_cells = ChunkIndex()
+        self.displayed_fluid_cells = ChunkIndex()
+        self.connectivity = ChunkIndex()
+        self._extent = None
+        self._occlusion = None
+        self._occlusion_stale = set()
+        self.lod_stale = set()
+        self.mesh_lru = OrderedDict()
+        self.mesh_bytes = 0
+        self.evicted = set()
+        self._visible = None
+        self.world_save = None
+        self.unsaved = set()
+        self._save_in_progress = None
 
     def serialise(self) -> bytes:
         "return a pickle-string of bytes with all the model's block data stored"
-        return pickle.dumps({"model": self.model, "dims": self.dims})
+        return pickle.dumps({"chunks": dict(self.model.items()), "dims": self.dims})
 
     def deserialise(self, bytes: bytes):
         """load a pickle-string of bytes into the model's chunk data and dims data
-        and update every chunk supplied"""
+        and queue an update of every chunk supplied"""
 
         source = pickle.loads(bytes)
-        self.model = source["model"]
-        self.dims = source["dims"]
-
-        with tqdm(total=self.dims[0] * self.dims[1] * 20, desc="loading chunks") as progress_bar:
-            for cx in range(self.dims[1]):
-                for cz in range(self.dims[0]):
-                    for cy in range(20):
-                        self.update_chunk((cx, cy, cz))
-                        progress_bar.update(1)
+        if "chunks" in source:
+            chunks = source["chunks"]
+        else:
+            # older saves hold the whole preallocated chunk list
+            chunks = {get_chunk_location(i): chunk for i, chunk in enumerate(source["model"]) if chunk is not None}
+        # saves from before the block registry hold copies of each block in
+        # list-backed chunks; converting them interns the copies
+        self._replace_chunks(ChunkIndex({
+            chunkloc: ArrayChunkSource.from_chunk(chunk) if isinstance(chunk, ChunkSource) else chunk
+            for chunkloc, chunk in chunks.items()
+            }), source["dims"], None)
+
+    def save(self, path: str) -> int:
+        """write the model's block data and dims as a region file save directory at path (see model.savefile)
+        only chunks changed since the last save are written when path is the save last written or loaded
+        return the number of bytes written"""
+        snapshot = self.begin_save(path)
+        try:
+            world_save, written = snapshot.write()
+        except BaseException:
+            self.end_save(snapshot, None)
+            raise
+        self.end_save(snapshot, world_save)
+        return written
+
+    def begin_save(self, path: str) -> SaveSnapshot:
+        """return the chunks save(path) writes, to be written by SaveSnapshot.write on any
+        thread and finished with end_save; only the chunk references are copied here
+        (a whole save of a world read lazily from another save reads every chunk first)"""
+        if self._save_in_progress is not None:
+            raise RuntimeError("a save is already in progress")
+        if self.world_save is None or os.path.abspath(path) != os.path.abspath(self.world_save.path):
+            snapshot = SaveSnapshot(path, dict(self.model.items()), self.dims, None)
+        else:
+            snapshot = SaveSnapshot(path, {chunkloc: self.model[chunkloc] for chunkloc in self.unsaved}, self.dims, self.world_save)
+        self.unsaved = set()
+        self._save_in_progress = snapshot
+        return snapshot
+
+    def end_save(self, snapshot: SaveSnapshot, world_save: WorldSave | None):
+        """finish the save begun with snapshot; world_save is the save it wrote, None if it failed
+        saves of a world since replaced (load, deserialise, generate) are ignored"""
+        if snapshot is not self._save_in_progress:
+            return
+        self._save_in_progress = None
+        if world_save is None:
+            self.unsaved |= snapshot.chunks.keys()
+        else:
+            self.world_save = world_save
+
+    def load(self, path: str):
+        """open the region file save directory at path and queue an update of every chunk in it
+        chunks are only read from disk when first needed"""
+        save = WorldSave(path)
+        self._replace_chunks(SavedChunkIndex(save), save.dims, save)
+
+    def _replace_chunks(self, chunks: ChunkIndex[ChunkSourceProtocol], dims: tuple[int, int], world_save: WorldSave | None):
+        if isinstance(self.model, SavedChunkIndex):
+            self.model.close()
+        self.model = chunks
+        self.dims = dims
+        self.world_save = world_save
+        self.unsaved.clear()
+        self._save_in_progress = None
+        self.connectivity.clear()
+        self._extent = None
+        self._occlusion = None
+
+        self.chunk_queue.clear()
+        self.mesh_uploads.clear()
+        self.chunk_queue.request_many(self.model.locations())
 
     def generate_spikey(self, _ = None):
         """spikey world generation
-        sets <Model>.dims and updates all chunks"""
+        sets <Model>.dims and queues updates of all chunks"""
         self.dims = 10, 10
         for cx, cz in xy_range(10, 10):
-            chunk = [AIR for _ in range(CHUNK_SIZE)]
+            chunk = ArrayChunkSource.filled(AIR)
+            ids = chunk.ids
             for ox, oz in xy_range(CHUNK_RADIUS, CHUNK_RADIUS):
                 height = random.randint(CHUNK_RADIUS - 8, CHUNK_RADIUS)
-                for y in range(height - 4):
-                    chunk[get_block_id_xyz(ox, y, oz)] = SAND  # type: ignore
-                for y in range(height - 4, height - 2):
-                    chunk[get_block_id_xyz(ox, y, oz)] = DIRT  # type: ignore
-                chunk[get_block_id_xyz(ox, height - 2, oz)] = GRASS  # type: ignore
-                chunk[get_block_id_xyz(ox, height - 1, oz)] = TALL_GRASS  # type: ignore
-            self.model[get_chunk_id((cx, 0, cz))] = ChunkSource(chunk, [])  # type: ignore
+                ids[ox, :height - 4, oz] = SAND.block_id
+                ids[ox, height - 4:height - 2, oz] = DIRT.block_id
+                ids[ox, height - 2, oz] = GRASS.block_id
+                ids[ox, height - 1, oz] = TALL_GRASS.block_id
+            self.model[(cx, 0, cz)] = chunk
     
-        for cx, cz in tqdm(xy_range(10, 10), total=100):
-            self.update_chunk((cx, 0, cz))
+        self.update_chunks([(cx, 0, cz) for cx, cz in xy_range(10, 10)])
 
     def generate_normal(self, config: WorldGenerationConfigProtocol):
         """standard world generation
-        sets <Model>.dims and calls update_chunk on surface chunks
+        sets <Model>.dims and queues updates of surface chunks
         """
         result: GenerateWorldResult = worldgen.generate_world(self, config)
         self.dims = result.mxz
@@ -121,8 +250,7 @@ class Model(ModelProtocol):
             cx, _, cy, _, cz, _ = get_chunk_and_offsets(surface_tile)
             for _cy in range(cy, cy + 3):
                 surface_chunks.add((cx, _cy, cz))
-        for surface_chunk in tqdm(surface_chunks, "updating surface chunks"):
-            self.update_chunk(surface_chunk)
+        self.chunk_queue.request_many(surface_chunks)
 
     def generate_cubes(self, _ = None):
         """cube world generation
@@ -134,173 +262,313 @@ class Model(ModelProtocol):
         for x in range(2):
             for y in range(2):
                 for z in range(2):
-                    chunk = [lst[l % 2] for _ in range(CHUNK_SIZE)]
+                    chunk = ArrayChunkSource.filled(lst[l % 2])
                     l += 1
-                    self.add_chunk((x, y, z), ChunkSource(chunk, []))
+                    self.add_chunk((x, y, z), chunk)
                     self.update_chunk((x, y, z))
 
     def generate(self, config: WorldGenerationConfigProtocol):
         "generate world using config"
+        # a new world, written whole by the next save
+        self.world_save = None
+        self._save_in_progress = None
+        self._occlusion = None
         self.generate_normal(config)
 
-    def add_chunk(self, chunkloc: ChunkLocation, chunk: ChunkSource):
+    def add_chunk(self, chunkloc: ChunkLocation, chunk: ChunkSourceProtocol):
         "add given chunk to chunkloc and immediately update"
-        model_chunk_id = get_chunk_id(chunkloc)
-        self.model[model_chunk_id] = chunk
+        self.model[chunkloc] = chunk
+        self.unsaved.add(chunkloc)
         self.update_chunk(chunkloc)
 
     def remove_chunk(self, chunkloc: ChunkLocation):
         "remove given chunkloc and immediately delete display"
-        model_chunk_id = get_chunk_id(chunkloc)
-        chunk_option = self.displayed[model_chunk_id]
-        if chunk_option is None:
+        self.clear_display(chunkloc)
+        self.model.pop(chunkloc)
+        self.unsaved.add(chunkloc)
+
+    def clear_display(self, chunkloc: ChunkLocation):
+        "delete the vertices drawn for chunkloc (the chunk data is kept)"
+        self._delete_display(chunkloc)
+        self.mesh_uploads.cancel(chunkloc)
+        self.evicted.discard(chunkloc)
+        self._drop_connectivity(chunkloc)
+        self.mark_lod_stale(chunkloc)
+
+    def _delete_display(self, chunkloc: ChunkLocation):
+        for displayed in (self.displayed, self.displayed_fluid):
+            chunk_option = displayed.pop(chunkloc)
+            if chunk_option is not None:
+                chunk_option.delete()
+        del self.displayed_cells[chunkloc]
+        del self.displayed_fluid_cells[chunkloc]
+        self.regions.discard(chunkloc)
+        self.mesh_bytes -= self.mesh_lru.pop(chunkloc, 0)
+        self._occlusion_stale.add(chunkloc)
+
+    def _track_mesh(self, chunkloc: ChunkLocation):
+        "account the bytes of the vertex lists of chunkloc, as most recently visible"
+        size = sum(vertex_list_bytes(vertex_list) for vertex_list in (self.displayed[chunkloc], self.displayed_fluid[chunkloc]))
+        self.mesh_bytes += size - self.mesh_lru.pop(chunkloc, 0)
+        self.mesh_lru[chunkloc] = size
+
+    def mark_visible(self, chunklocs: Iterable[ChunkLocation]):
+        "record the chunks drawn this frame; they are evicted last and never this frame"
+        self._visible = set(chunklocs)
+        for chunkloc in self._visible:
+            if chunkloc in self.mesh_lru:
+                self.mesh_lru.move_to_end(chunkloc)
+
+    def enforce_mesh_budget(self) -> int:
+        """evict the displays of the least recently visible chunks until their
+        vertex data fits mesh_budget; the chunk data is kept and evicted chunks
+        are remeshed once they are in view again (see request_evicted)
+        return the number of chunks evicted"""
+        evicted = 0
+        if self._visible is None:
+            # nothing drawn yet to tell which meshes are needed
+            return evicted
+        while 0 < self.mesh_budget < self.mesh_bytes and self.mesh_lru:
+            chunkloc = next(iter(self.mesh_lru))
+            if chunkloc in self._visible:
+                # everything left was drawn this frame
+                break
+            self._delete_display(chunkloc)
+            self.evicted.add(chunkloc)
+            evicted += 1
+        return evicted
+
+    def request_evicted(self, frustum: Frustum, position: Sequence[float], max_distance: float = 0.,
+                        reachable: Collection[ChunkLocation] | None = None):
+        """queue remeshes of the evicted chunks inside frustum
+        (and within max_distance horizontally of position, unless 0)
+        with occlusion culling pass the reachable chunks, so only evicted chunks
+        that will be drawn (and so marked visible) are brought back"""
+        if not self.evicted:
             return
-        chunk_option.delete()
-        self.displayed[model_chunk_id] = None
-        self.model[model_chunk_id] = None
-
-    def update_chunk(self, chunkloc: ChunkLocation):
-        "draw vertices at the given chunkloc"
+        for chunkloc in visible_chunks(frustum, self.evicted, position):
+            if chunkloc in self.mesh_uploads or (reachable is not None and chunkloc not in reachable):
+                continue
+            if max_distance > 0:
+                low_x, low_z = chunkloc[0] * CHUNK_RADIUS, chunkloc[2] * CHUNK_RADIUS
+                dx = max(low_x - position[0], 0., position[0] - low_x - CHUNK_RADIUS)
+                dz = max(low_z - position[2], 0., position[2] - low_z - CHUNK_RADIUS)
+                if dx * dx + dz * dz > max_distance * max_distance:
+                    continue
+            self.chunk_queue.request(chunkloc)
+
+    def _drop_connectivity(self, chunkloc: ChunkLocation):
+        "forget the connectivity of chunkloc, its data or display changed"
+        del self.connectivity[chunkloc]
+        self._occlusion_stale.add(chunkloc)
+
+    def chunk_connectivity(self, chunkloc: ChunkLocation) -> int:
+        "return which faces of the chunk at chunkloc see each other (see model.visibility)"
+        mask = self.connectivity[chunkloc]
+        if mask is None:
+            mask = chunk_connectivity(self.model[chunkloc])
+            self.connectivity[chunkloc] = mask
+        return mask
+
+    def chunk_extent(self) -> tuple[ChunkLocation, ChunkLocation]:
+        "return the lowest and highest corners (inclusive) of the box holding every chunk"
+        # chunks are only added or removed, so the count tells when to recompute
+        if self._extent is None or self._extent[0] != len(self.model):
+            chunklocs = np.array(list(self.model.locations()), np.int64).reshape(-1, 3)
+            if len(chunklocs) == 0:
+                return (0, 0, 0), (-1, -1, -1)
+            low, high = chunklocs.min(axis=0).tolist(), chunklocs.max(axis=0).tolist()
+            self._extent = len(self.model), tuple(low), tuple(high)  # type: ignore
+        return self._extent[1], self._extent[2]
+
+    def reachable_chunks(self, position: Sequence[float], frustum: Frustum) -> list[ChunkLocation] | None:
+        """return the chunks inside frustum seen from position through open chunk faces, nearest first
+        None when position is outside every chunk (nothing can be occluded)"""
+        low, high = self.chunk_extent()
+        cx, ox, cy, oy, cz, oz = get_chunk_and_offsets((floor(position[0]), floor(position[1]), floor(position[2])))
+        start = cx, cy, cz
+        if not all(lo <= c <= hi for lo, c, hi in zip(low, start, high)):
+            return None
+        start_faces = exit_faces(self.model[start], (ox, oy, oz))
+        masks, shown = self.occlusion_grids()
+        return reachable_chunks(start, start_faces, masks, shown, frustum, low)
+
+    def occlusion_grids(self) -> tuple[np.ndarray, np.ndarray]:
+        """return the connectivity mask and whether it is displayed (or evicted, to be
+        remeshed once reached) of every chunk in chunk_extent, updating the entries of
+        chunks changed since the last call"""
+        low, high = self.chunk_extent()
+        if self._occlusion is None or self._occlusion[0] != (low, high):
+            shape = tuple(hi - lo + 1 for lo, hi in zip(low, high))
+            self._occlusion = (low, high), np.full(shape, OPEN, np.int64), np.zeros(shape, np.bool_)
+            stale: Iterable[ChunkLocation] = self.model.locations()
+        else:
+            stale = self._occlusion_stale
+        _, masks, shown = self._occlusion
+        for chunkloc in stale:
+            if all(lo <= c <= hi for lo, c, hi in zip(low, chunkloc, high)):
+                index = tuple(c - lo for c, lo in zip(chunkloc, low))
+                masks[index] = self._occlusion_mask(chunkloc)
+                shown[index] = chunkloc in self.displayed or chunkloc in self.evicted
+        self._occlusion_stale = set()
+        return masks, shown
+
+    def _occlusion_mask(self, chunkloc: ChunkLocation) -> int:
+        """connectivity of chunkloc for occlusion culling; only displayed chunks are
+        flood filled and no chunk is read, others are open unless uniform and known"""
+        if chunkloc in self.displayed:
+            return self.chunk_connectivity(chunkloc)
+        mask = self.connectivity[chunkloc]
+        if mask is not None:
+            return mask
+        chunk = self.model.peek(chunkloc)
+        if chunk is None or chunk.uniform is None:
+            # nothing drawn is hidden behind a chunk assumed open
+            return OPEN
+        return chunk_connectivity(chunk)
+
+    def mark_lod_stale(self, chunkloc: ChunkLocation):
+        if self.lod_distance > 0:
+            self.lod_stale.add((chunkloc[0], chunkloc[2]))
+
+    def update_lod(self, column: ColumnLocation):
+        "rebuild the coarse terrain of a chunk column (see model.lod)"
+        cx, cz = column
+        region = self.regions[(cx, 0, cz)]
+        if region is None:
+            # nothing of the column is displayed
+            return
+        (_, cy_low, _), (_, cy_high, _) = self.chunk_extent()
+        heights, tops = column_surface(self, column, cy_low, cy_high)
+        # walls of the world, as in model.mesher._padded_ids
+        walls = (cz == self.dims[0] - 1, cz == 0, cx == self.dims[0] - 1, cx == 0)
+        mesh = build_lod_mesh(column, heights, tops, cy_low * CHUNK_RADIUS - .5, walls)
+        self.regions.set_lod(column, add_mesh(region.batch_lod, self.group, mesh) if mesh.count else None)
+
+    def update_lods(self, budget_ms: float = MESH_FRAME_BUDGET) -> int:
+        """rebuild out of date coarse terrain until budget_ms is spent (at least one column)
+        return the number of columns rebuilt"""
+        start = time.perf_counter()
+        done = 0
+        while self.lod_stale:
+            self.update_lod(self.lod_stale.pop())
+            done += 1
+            if time.perf_counter() - start >= budget_ms / 1000.:
+                break
+        return done
+
+    def uniform_chunk_visible(self, chunkloc: ChunkLocation, block: BlockProtocol) -> bool:
+        "return whether a chunk filled with block can have any visible faces"
+        if block.textures is None and block.variants is None:
+            # nothing to draw (air)
+            return False
+        if block.transparent or block.draw_style != DrawStyle.BLOCK:
+            return True
+        # a solid chunk is hidden when every neighbour is a solid uniform chunk
+        cx, cy, cz = chunkloc
+        for dx, dy, dz in V_TABLE:
+            neighbour = self.model[(cx + dx, cy + dy, cz + dz)]
+            uniform = None if neighbour is None else neighbour.uniform
+            if uniform is None or REGISTRY.transparent[uniform]:
+                return True
+        return False
+
+    def needs_mesh(self, chunkloc: ChunkLocation) -> bool:
+        """return whether the chunk at chunkloc has to be meshed to be drawn
+        hidden uniform chunks have their display cleared instead"""
 
         # identify chunk 
-        model_chunk_id = get_chunk_id(chunkloc)
-        chunk_source: ChunkSource | None = self.model[model_chunk_id]
+        chunk_source: ChunkSourceProtocol | None = self.model[chunkloc]
         if chunk_source is None:
             # no need to update an unloaded chunk
-            return
-        chunk = chunk_source.blocks
+            return False
 
-        # assign base positions
-        basex, basey, basez = chunkloc[0] * CHUNK_RADIUS, chunkloc[1] * CHUNK_RADIUS, chunkloc[2] * CHUNK_RADIUS
-        
-        # chunk boundries
-        lim = CHUNK_RADIUS - 1
-        blim = (self.dims[0] * CHUNK_RADIUS) - 1
-
-        # draw closure data
-        # these are going to be used by batch.add
-        sidecount = 0
-        vertices: list[float] = []
-        texture_data: list[float] = []
-        colour_data: list[int] = []
-        normals: list[float] = []
-
-        def draw(
-                side: list[int], 
-                dirs: list[float], 
-                textures: list[float], 
-                norms: list[float]
-                ):
-            nonlocal sidecount # immutable int -> nonlocal required
-            vertices.extend([x+dirs[0],y+dirs[1],z+dirs[2], x+dirs[3],y+dirs[4],z+dirs[5], x+dirs[6],y+dirs[7],z+dirs[8], x+dirs[9],y+dirs[10],z+dirs[11]])
-            texture_data.extend(textures)
-            colour_data.extend(side)
-            normals.extend(norms)
-            sidecount += 1
-        
-        fluid_side_count = 0
-        fluid_vertices: list[float] = []
-        fluid_texture_data: list[float] = []
-        fluid_colour_data: list[int] = []
-        fluid_normals: list[float] = []
-
-
-        def draw_fluid(textures: tuple[float, float, float, float, float, float, float, float]):
-            nonlocal fluid_side_count # immutable int -> nonlocal required
-            dirs = Vertex.TOP_FLUID
-            fluid_vertices.extend([x+dirs[0],y+dirs[1],z+dirs[2], x+dirs[3],y+dirs[4],z+dirs[5], x+dirs[6],y+dirs[7],z+dirs[8], x+dirs[9],y+dirs[10],z+dirs[11]])
-            fluid_texture_data.extend(textures)
-            fluid_colour_data.extend(Colour.TOP)
-            fluid_normals.extend(Normal.TOP)
-            fluid_side_count += 1
-
-        for ox, oy, oz in xyz_range(CHUNK_RADIUS, CHUNK_RADIUS, CHUNK_RADIUS):
-
-            x, y, z = basex + ox, basey + oy, basez + oz
-
-            candidate = chunk[get_block_id_xyz(ox, oy, oz)]
-
-            # if variants is set, we'll use the seeded random choice generator to select a random texture to use
-            texture = (choice(candidate.variants, (x, y, z)) if candidate.variants is not None else candidate.textures)
-
-            if texture is not None:
-
-                # block terrain renderer
-                if candidate.draw_style == DrawStyle.BLOCK:
-
-                    # for a side to get drawn here, the block adjacent to it
-                    # must be transparent and not at the world's edge (o<n> == 0 / blim)
-                    # each of the patterns below checks if the side adjacent tile *in the
-                    # same chunk* and then checks across chunk boundries to utilise
-                    # short circuit evaluation
-
-                    # top
-                    if oy == lim or chunk[get_block_id_xyz(ox, oy + 1, oz)].transparent:
-                        if oy != lim or (oy == lim and self.get_block((x, y + 1, z)).transparent):
-                            draw(Colour.TOP, Vertex.TOP, texture.top, Normal.TOP)  # type: ignore
-                    # bottom
-                    if oy == 0 or chunk[get_block_id_xyz(ox, oy - 1, oz)].transparent:
-                        if oy != 0 or (oy == 0 and self.get_block((x, y - 1, z)).transparent) and y != 0:
-                            draw(Colour.BOTTOM, Vertex.BOT, texture.bottom, Normal.BOTTOM)  # type: ignore
-                    # front
-                    if oz == lim or chunk[get_block_id_xyz(ox, oy, oz + 1)].transparent:
-                        if z != blim and (oz != lim or (oz == lim and self.get_block((x, y, z + 1)).transparent)):
-                            draw(Colour.FRONT, Vertex.FRONT, texture.side, Normal.FRONT)  # type: ignore
-
-                    # back
-                    if oz == 0 or chunk[get_block_id_xyz(ox, oy, oz - 1)].transparent:
-                        if z != 0 and (oz != 0 or (oz == 0 and self.get_block((x, y, z - 1)).transparent)):
-                            draw(Colour.BACK, Vertex.BACK, texture.side, Normal.BACK)  # type: ignore
-
-                    # left
-                    if ox == lim or chunk[get_block_id_xyz(ox + 1, oy, oz)].transparent:
-                        if x != blim and (ox != lim or (ox == lim and self.get_block((x + 1, y, z)).transparent)):
-                            draw(Colour.LEFT, Vertex.LEFT, texture.side, Normal.LEFT)  # type: ignore
-
-                    # right
-                    if ox == 0 or chunk[get_block_id_xyz(ox - 1, oy, oz)].transparent:
-                        if x != 0 and (ox != 0 or (ox == 0 and self.get_block((x - 1, y, z)).transparent)):
-                            draw(Colour.RIGHT, Vertex.RIGHT, texture.side, Normal.RIGHT)  # type: ignore
-
-                # grass terrain renderer
-                elif candidate.draw_style == DrawStyle.GRASS:
-                    n = 0.5
-                    m = 0.4
-
-                    draw(Colour.LEFT, [m, n, m, -m, n, -m, -m, -n, -m, m, -n, m], texture.top, Normal.TOP)  # type: ignore
-                    draw(Colour.LEFT, [-m, n, m, m, n, -m, m, -n, -m, -m, -n, m], texture.top, Normal.TOP)  # type: ignore
-                    draw(Colour.LEFT, [-m, n, -m, m, n, m, m, -n, m, -m, -n, -m], texture.top, Normal.TOP)  # type: ignore
-                    draw(Colour.LEFT, [m, n, -m, -m, n, m, -m, -n, m, m, -n, -m], texture.top, Normal.TOP)  # type: ignore
-
-                # water renderer
-                elif candidate.draw_style == DrawStyle.FLUID:
-                    if oy == lim or chunk[get_block_id_xyz(ox, oy + 1, oz)].transparent:
-                        above = self.get_block((x, y + 1, z))
-                        if (oy != lim and above != candidate) or (oy == lim and above.transparent and above != candidate):
-                            draw_fluid(texture.top)
-
-        draw_data = self.batch.add(sidecount * 4, GL_QUADS, self.group,
-            ('v3f/static', vertices),
-            ('t2f/static', texture_data),
-            ("c4B/static", colour_data),
-            ("n3f/static", normals)
-        )
-        draw_data_fluid = self.batch_fluid.add(fluid_side_count * 4, GL_QUADS, self.group,
-            ('v3f/static', fluid_vertices),
-            ('t2f/static', fluid_texture_data),
-            ("c4B/static", fluid_colour_data),
-            ("n3f/static", fluid_normals)
-        )
-
-        current_display = self.displayed[model_chunk_id]
-        current_fluid = self.displayed_fluid[model_chunk_id]
-        self.displayed[model_chunk_id] = draw_data
-        self.displayed_fluid[model_chunk_id] = draw_data_fluid
+        uniform = chunk_source.uniform
+        if uniform is not None and not self.uniform_chunk_visible(chunkloc, REGISTRY[uniform]):
+            self.clear_display(chunkloc)
+            return False
+        return True
+
+    def update_chunk(self, chunkloc: ChunkLocation):
+        "draw vertices at the given chunkloc"
+        if not self.needs_mesh(chunkloc):
+            return
+        self.display_chunk(chunkloc, *self.build_chunk_mesh(chunkloc))
+
+    def build_chunk_mesh(self, chunkloc: ChunkLocation) -> tuple[MeshData, MeshData]:
+        "return the (solid, fluid) meshes of chunkloc; safe to call from the mesh pool"
+        return build_chunk_mesh(self, chunkloc, self.dims, self.greedy_meshing)
+
+    def submit_chunks(self, chunklocs: Iterable[ChunkLocation]):
+        """start meshing every chunkloc on the mesh pool without waiting
+        the meshes are displayed once mesh_uploads drains them"""
+        self.mesh_uploads.submit([chunkloc for chunkloc in chunklocs if self.needs_mesh(chunkloc)])
+
+    def finish_meshing(self) -> int:
+        "mesh and display every queued chunk now, return the number of chunks displayed"
+        self.chunk_queue.run_all()
+        return self.mesh_uploads.finish()
+
+    def update_chunks(self, chunklocs: Iterable[ChunkLocation], desc: str | None = None):
+        """draw vertices at every chunkloc
+        meshes are built in parallel (see model.mesher.build_chunk_meshes) and
+        uploaded here, on the thread owning the gl context, as each finishes"""
+        pending = [chunkloc for chunkloc in chunklocs if self.needs_mesh(chunkloc)]
+        meshes = build_chunk_meshes(self, pending, self.dims, self.greedy_meshing)
+        for chunkloc, mesh, fluid_mesh in tqdm(meshes, desc, total=len(pending), disable=desc is None):
+            self.display_chunk(chunkloc, mesh, fluid_mesh)
+
+    def display_chunk(self, chunkloc: ChunkLocation, mesh: MeshData, fluid_mesh: MeshData) -> int:
+        """upload meshes built for chunkloc and replace its current display
+        return the bytes uploaded"""
+
+        # a mesh of chunkloc still being built is no newer than this one
+        self.mesh_uploads.cancel(chunkloc)
+        region = self.regions.add(chunkloc)
+        draw_data = add_mesh(region.batch, self.group, mesh, self.packed_vertices)
+        draw_data_fluid = add_mesh(region.batch_fluid, self.group, fluid_mesh)
+
+        current_display = self.displayed[chunkloc]
+        current_fluid = self.displayed_fluid[chunkloc]
+        self.displayed[chunkloc] = draw_data
+        self.displayed_fluid[chunkloc] = draw_data_fluid
+        self.displayed_cells[chunkloc] = mesh.cells
+        self.displayed_fluid_cells[chunkloc] = fluid_mesh.cells
+        self._drop_connectivity(chunkloc)
+        self.mark_lod_stale(chunkloc)
 
         if current_display is not None:
             current_display.delete()
         if current_fluid is not None:
             current_fluid.delete()
+        self.evicted.discard(chunkloc)
+        self._track_mesh(chunkloc)
+        return self.mesh_lru[chunkloc]
+
+    def patch_chunk(self, chunkloc: ChunkLocation, cells: Iterable[int]) -> bool:
+        """remesh only the given cells of a displayed chunk, rewriting their
+        quads inside its existing vertex lists
+        return False (changing nothing) if the chunk needs a full update instead"""
+        vertex_list = self.displayed[chunkloc]
+        fluid_list = self.displayed_fluid[chunkloc]
+        quad_cells = self.displayed_cells[chunkloc]
+        fluid_cells = self.displayed_fluid_cells[chunkloc]
+        if vertex_list is None or fluid_list is None or quad_cells is None or fluid_cells is None:
+            # not displayed, or meshed greedily
+            return False
+        if self.model[chunkloc] is None or chunkloc in self.chunk_queue or chunkloc in self.mesh_uploads:
+            # a full remesh is already on its way
+            return False
+
+        selected = np.zeros(CHUNK_SIZE, np.bool_)
+        selected[list(cells)] = True
+        mesh, fluid_mesh = build_chunk_mesh(self, chunkloc, self.dims, False, selected.reshape(CHUNK_SHAPE))
+        self.displayed_cells[chunkloc] = patch_vertex_list(vertex_list, quad_cells, selected, mesh, self.packed_vertices)
+        self.displayed_fluid_cells[chunkloc] = patch_vertex_list(fluid_list, fluid_cells, selected, fluid_mesh)
+        self._drop_connectivity(chunkloc)
+        self.mark_lod_stale(chunkloc)
+        self._track_mesh(chunkloc)
+        return True
 
     def get_block(self, pos: Location) -> BlockProtocol:
         
@@ -312,13 +580,12 @@ class Model(ModelProtocol):
 
         chunkloc = (cx, cy, cz)
 
-        model_chunk_id = get_chunk_id(chunkloc)
-        chunk_source = self.model[model_chunk_id]
+        chunk_source = self.model[chunkloc]
 
         if chunk_source is None:
             return AIR
 
-        return chunk_source.blocks[get_block_id_xyz(ox, oy, oz)]
+        return chunk_source.get(ox, oy, oz)
 
     def add_block(self, pos: Location, block: BlockProtocol, defer: bool=False):
 
@@ -330,40 +597,70 @@ class Model(ModelProtocol):
 
         chunkloc = (cx, cy, cz)
 
-        model_chunk_id = get_chunk_id(chunkloc)
-        chunk_source = self.model[model_chunk_id]
+        chunk_source = self.model[chunkloc]
 
         if chunk_source is None:
-            chunk: list[BlockProtocol] = [AIR for _ in range(CHUNK_SIZE)]
-            self.model[model_chunk_id] = ChunkSource(chunk, [])
-        else:
-            chunk = chunk_source.blocks
+            chunk_source = ArrayChunkSource.filled(AIR)
+            self.model[chunkloc] = chunk_source
+        elif self._save_in_progress is not None and self._save_in_progress.chunks.get(chunkloc) is chunk_source:
+            # the save in progress still reads this chunk, edit a copy
+            chunk_source = ArrayChunkSource.from_chunk(chunk_source)
+            self.model[chunkloc] = chunk_source
 
-        chunk[get_block_id_xyz(ox, oy, oz)] = block
+        chunk_source.set(ox, oy, oz, block)
+        self.unsaved.add(chunkloc)
 
         if defer:
             return
 
-        self.update_chunk(chunkloc)
-    
-        # update adjacent chunks
-
-        lim = CHUNK_RADIUS - 1
+        # the edited cell and the facing sides of its neighbours change
+        self.mark_dirty(chunkloc, (ox, oy, oz))
+        for dx, dy, dz in V_TABLE:
+            ncx, nox, ncy, noy, ncz, noz = get_chunk_and_offsets((pos[0] + dx, pos[1] + dy, pos[2] + dz))
+            self.mark_dirty((ncx, ncy, ncz), (nox, noy, noz))
 
-        if ox == 0:
-            self.update_chunk((cx - 1, cy, cz))
-        if ox == lim:
-            self.update_chunk((cx + 1, cy, cz))
+        if not self._edit_depth:
+            self.flush()
 
-        if oy == 0:
-            self.update_chunk((cx, cy - 1, cz))
-        if oy == lim:
-            self.update_chunk((cx, cy + 1, cz))
-
-        if oz == 0:
-            self.update_chunk((cx, cy, cz - 1))
-        if oz == lim:
-            self.update_chunk((cx, cy, cz + 1))
+    def mark_dirty(self, chunkloc: ChunkLocation, offsets: tuple[int, int, int] | None = None):
+        """note that the cell at offsets in chunkloc (or the whole chunk when
+        offsets is None) needs remeshing on the next flush"""
+        if chunkloc in self.dirty and self.dirty[chunkloc] is None:
+            return
+        if offsets is None:
+            self.dirty[chunkloc] = None
+            return
+        self.dirty.setdefault(chunkloc, set()).add(get_block_id_xyz(*offsets))  # type: ignore
+
+    def flush(self):
+        """remesh every dirty chunk once and clear the dirty set
+        chunks with few dirty cells are patched in place (see patch_chunk),
+        the rest are queued on chunk_queue"""
+        for chunkloc, cells in self.dirty.items():
+            # a mesh of the chunk still being built or uploaded predates the edit,
+            # and the display it was to replace is out of date too
+            pending = chunkloc in self.mesh_uploads
+            self.mesh_uploads.cancel(chunkloc)
+            if chunkloc in self.evicted:
+                # remeshed when next in view
+                self._drop_connectivity(chunkloc)
+                self.mark_lod_stale(chunkloc)
+                continue
+            if pending or cells is None or len(cells) > MESH_PATCH_LIMIT or not self.patch_chunk(chunkloc, cells):
+                self.chunk_queue.request(chunkloc)
+        self.dirty.clear()
+
+    @contextmanager
+    def batch_edits(self) -> Iterator[None]:
+        """defer remeshing of edits made inside the block until it exits
+        so each touched chunk is remeshed once however many edits touch it (nestable)"""
+        self._edit_depth += 1
+        try:
+            yield
+        finally:
+            self._edit_depth -= 1
+            if not self._edit_depth:
+                self.flush()
 
     def remove_block(self, pos):
         self.add_block(pos, AIR)
@@ -377,6 +674,6 @@ class Model(ModelProtocol):
     def surface_height(self, x: int, z: int) -> int:
         "return surface height at a specific x:z position"
         for y in range(192):
-            if self.get_block((x, y, z)) == AIR:
+            if self.get_block((x, y, z)) is AIR:
                 return y
         raise IndexError("No surface found")
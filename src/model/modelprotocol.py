@@ -1,30 +1,151 @@
-
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Protocol
+from typing import ContextManager, Protocol
 
+import numpy as np
 from blocks import BlockProtocol
+from blocks.registry import REGISTRY
+from maths.blocks import get_block_id_xyz
+from maths.constants import CHUNK_RADIUS, CHUNK_SIZE
 from maths.types import ChunkLocation, Location
 
+from model.chunkindex import ChunkIndex
 from model.worldgenconfig import WorldGenerationConfigProtocol
 
+# dtype of the block id arrays backing ArrayChunkSource
+BLOCK_ID_DTYPE = np.uint16
+
+CHUNK_SHAPE = (CHUNK_RADIUS, CHUNK_RADIUS, CHUNK_RADIUS)
+
+
+class ChunkSourceProtocol(Protocol):
+
+    models: list[None]
+
+    @property
+    def uniform(self) -> int | None: ...
+
+    def get(self, ox: int, oy: int, oz: int) -> BlockProtocol: ...
+    def set(self, ox: int, oy: int, oz: int, block: BlockProtocol): ...
+    def get_blocks(self) -> list[BlockProtocol]: ...
+    def as_array(self) -> np.ndarray: ...
 
 @dataclass(frozen=False)
-class ChunkSource:
+class ChunkSource(ChunkSourceProtocol):
     blocks: list[BlockProtocol]
     models: list[None]
 
+    @property
+    def uniform(self) -> int | None:
+        "list-backed chunks are never stored as uniform"
+        return None
+
+    def get(self, ox: int, oy: int, oz: int) -> BlockProtocol:
+        return self.blocks[get_block_id_xyz(ox, oy, oz)]
+
+    def set(self, ox: int, oy: int, oz: int, block: BlockProtocol):
+        self.blocks[get_block_id_xyz(ox, oy, oz)] = block
+
+    def get_blocks(self) -> list[BlockProtocol]:
+        "return the chunk's blocks as a flat list (see maths.blocks.get_block_id)"
+        return self.blocks
+
+    def as_array(self) -> np.ndarray:
+        "return a new array of block ids with shape CHUNK_SHAPE"
+        ids = np.fromiter((REGISTRY.id_of(block) for block in self.blocks), BLOCK_ID_DTYPE, CHUNK_SIZE)
+        return ids.reshape(CHUNK_SHAPE)
+
+@dataclass(frozen=False)
+class ArrayChunkSource(ChunkSourceProtocol):
+    """Chunk backed by a contiguous array of block ids
+
+    ids[ox, oy, oz] is the id of the block at that offset (see blocks.registry)
+    the array is C-ordered, so ids.ravel() is laid out like ChunkSource.blocks
+
+    a chunk holding a single block type stores no array (ids is None) and
+    only the block id in fill; the array is created on the first write of a
+    different block (see promote / compact)
+    """
+    ids: np.ndarray | None
+    models: list[None]
+    fill: int = 0
+
+    @staticmethod
+    def filled(block: BlockProtocol) -> ArrayChunkSource:
+        "return a uniform chunk filled with block"
+        return ArrayChunkSource(None, [], REGISTRY.id_of(block))
+
+    @staticmethod
+    def from_chunk(chunk: ChunkSourceProtocol) -> ArrayChunkSource:
+        "return an array-backed copy of chunk (uniform if possible)"
+        array_chunk = ArrayChunkSource(np.array(chunk.as_array(), BLOCK_ID_DTYPE), chunk.models)
+        array_chunk.compact()
+        return array_chunk
+
+    @property
+    def uniform(self) -> int | None:
+        "id of the single block filling the chunk, or None if it has mixed blocks"
+        return self.fill if self.ids is None else None
+
+    def promote(self) -> np.ndarray:
+        "make sure the chunk has a backing array and return it"
+        if self.ids is None:
+            self.ids = np.full(CHUNK_SHAPE, self.fill, BLOCK_ID_DTYPE)
+        return self.ids
+
+    def compact(self) -> bool:
+        "drop the backing array if every block is the same; return whether the chunk is uniform"
+        if self.ids is None:
+            return True
+        first = self.ids.flat[0]
+        if not (self.ids == first).all():
+            return False
+        self.fill = int(first)
+        self.ids = None
+        return True
+
+    def get(self, ox: int, oy: int, oz: int) -> BlockProtocol:
+        if self.ids is None:
+            return REGISTRY.blocks[self.fill]
+        return REGISTRY.blocks[self.ids[ox, oy, oz]]
+
+    def set(self, ox: int, oy: int, oz: int, block: BlockProtocol):
+        block_id = REGISTRY.id_of(block)
+        if self.ids is None:
+            if block_id == self.fill:
+                return
+            self.promote()
+        self.ids[ox, oy, oz] = block_id  # type: ignore
+
+    def get_blocks(self) -> list[BlockProtocol]:
+        "return the chunk's blocks as a new flat list (see maths.blocks.get_block_id)"
+        blocks = REGISTRY.blocks
+        if self.ids is None:
+            return [blocks[self.fill]] * CHUNK_SIZE
+        return [blocks[i] for i in self.ids.ravel().tolist()]
+
+    def as_array(self) -> np.ndarray:
+        """return the backing array of block ids (not a copy)
+        uniform chunks return a read-only broadcast of fill instead"""
+        if self.ids is None:
+            return np.broadcast_to(BLOCK_ID_DTYPE(self.fill), CHUNK_SHAPE)
+        return self.ids
+
 class ModelProtocol(Protocol):
 
-    model: list[ChunkSource | None]
+    model: ChunkIndex[ChunkSourceProtocol]
 
     def serialise(self) -> bytes: ...
     def deserialise(self, data: bytes): ...
+    def save(self, path: str) -> int: ...
+    def load(self, path: str): ...
     def generate(self, config: WorldGenerationConfigProtocol): ...
-    def add_chunk(self, chunkloc: ChunkLocation, chunk: ChunkSource): ...
+    def add_chunk(self, chunkloc: ChunkLocation, chunk: ChunkSourceProtocol): ...
     def remove_chunk(self, chunkloc: ChunkLocation): ...
     def update_chunk(self, chunkloc: ChunkLocation): ...
     def get_block(self, pos: Location) -> BlockProtocol: ...
     def add_block(self, pos: Location, block: BlockProtocol, defer: bool = False): ...
     def remove_block(self, pos: Location): ...
+    def flush(self): ...
+    def batch_edits(self) -> ContextManager[None]: ...
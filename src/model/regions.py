@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import ItemsView, Iterator, Sequence
+
+import numpy as np
+from maths.constants import CHUNK_RADIUS, REGION_SIZE
+from maths.culling import Frustum, visible_boxes
+from maths.types import ChunkLocation
+from pyglet.graphics import Batch  # type: ignore
+from pyglet.graphics.vertexdomain import VertexList  # type: ignore
+
+# x, z of a region column, in regions
+RegionLocation = tuple[int, int]
+
+
+@dataclass
+class Region:
+    """batches holding the vertex lists of every displayed chunk in one region column
+    and the coarse terrain drawn instead when the region is far away (see model.lod)"""
+    location: RegionLocation
+    size: int
+    batch: Batch = field(default_factory=Batch)
+    batch_fluid: Batch = field(default_factory=Batch)
+    batch_lod: Batch = field(default_factory=Batch)
+    chunks: set[ChunkLocation] = field(default_factory=set)
+    # coarse terrain by chunk column
+    lod: dict[tuple[int, int], VertexList] = field(default_factory=dict)
+    # lowest and highest chunk y displayed in the region so far
+    cy_low: int = 0
+    cy_high: int = -1
+
+    @property
+    def empty(self) -> bool:
+        return not self.chunks and not self.lod
+
+    def bounds(self) -> tuple[tuple[float, float, float], tuple[float, float, float]]:
+        "return the world space (low, high) corners of the region (see maths.culling.chunk_bounds)"
+        rx, rz = self.location
+        span = self.size * CHUNK_RADIUS
+        low = rx * span - .5, self.cy_low * CHUNK_RADIUS - .5, rz * span - .5
+        high = (rx + 1) * span - .5, (self.cy_high + 1) * CHUNK_RADIUS - .5, (rz + 1) * span - .5
+        return low, high
+
+    def distance(self, position: Sequence[float]) -> float:
+        "horizontal distance from position to the nearest point of the region"
+        (low_x, _, low_z), (high_x, _, high_z) = self.bounds()
+        dx = max(low_x - position[0], 0., position[0] - high_x)
+        dz = max(low_z - position[2], 0., position[2] - high_z)
+        return (dx * dx + dz * dz) ** .5
+
+
+class RegionIndex:
+    """Displayed chunks grouped into columns of size x size chunks
+
+    every region has its own batches, so one draw call covers a region and
+    whole regions are culled at once; a chunk changing only touches the
+    buffers of its own region. regions left with neither chunks nor coarse
+    terrain are dropped
+    """
+
+    size: int
+    _regions: dict[RegionLocation, Region]
+
+    def __init__(self, size: int = REGION_SIZE):
+        self.size = size
+        self._regions = {}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def __iter__(self) -> Iterator[Region]:
+        return iter(self._regions.values())
+
+    def __getitem__(self, chunkloc: ChunkLocation) -> Region | None:
+        "the region holding chunkloc, if any"
+        return self._regions.get(self.region_location(chunkloc))
+
+    def items(self) -> ItemsView[RegionLocation, Region]:
+        return self._regions.items()
+
+    def region_location(self, chunkloc: ChunkLocation) -> RegionLocation:
+        return chunkloc[0] // self.size, chunkloc[2] // self.size
+
+    def add(self, chunkloc: ChunkLocation) -> Region:
+        "return the region of chunkloc (creating it), registering chunkloc in it"
+        location = self.region_location(chunkloc)
+        region = self._regions.get(location)
+        if region is None:
+            region = self._regions[location] = Region(location, self.size, cy_low=chunkloc[1], cy_high=chunkloc[1])
+        region.chunks.add(chunkloc)
+        region.cy_low, region.cy_high = min(region.cy_low, chunkloc[1]), max(region.cy_high, chunkloc[1])
+        return region
+
+    def discard(self, chunkloc: ChunkLocation):
+        """unregister chunkloc, dropping its region if that empties it
+        the vertex lists of chunkloc must already be deleted"""
+        location = self.region_location(chunkloc)
+        region = self._regions.get(location)
+        if region is None:
+            return
+        region.chunks.discard(chunkloc)
+        if region.empty:
+            del self._regions[location]
+
+    def set_lod(self, column: tuple[int, int], vertex_list: VertexList | None):
+        """replace the coarse terrain of a chunk column (deleting the current one)
+        vertex_list must belong to the batch_lod of the column's region"""
+        location = self.region_location((column[0], 0, column[1]))
+        region = self._regions.get(location)
+        if region is None:
+            return
+        current = region.lod.pop(column, None)
+        if current is not None:
+            current.delete()
+        if vertex_list is not None:
+            region.lod[column] = vertex_list
+        if region.empty:
+            del self._regions[location]
+
+    def clear(self):
+        self._regions.clear()
+
+    def visible(self, frustum: Frustum, eye: Sequence[float]) -> list[Region]:
+        "return the regions inside frustum, nearest eye (front) first"
+        regions = list(self._regions.values())
+        if not regions:
+            return []
+        bounds = np.array([region.bounds() for region in regions], np.float64)
+        return [regions[i] for i in visible_boxes(frustum, bounds[:, 0], bounds[:, 1], eye).tolist()]
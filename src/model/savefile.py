@@ -0,0 +1,628 @@
+from __future__ import annotations
+
+import json
+import lzma
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import (AbstractSet, Callable, ItemsView, Iterable, Iterator,
+                    ValuesView)
+
+import numpy as np
+from blocks.registry import REGISTRY
+from maths.constants import CHUNK_SIZE, SAVE_COMPRESSION, SAVE_REGION_SIZE
+from maths.types import ChunkLocation
+
+from model.chunkindex import ChunkIndex
+from model.modelprotocol import (BLOCK_ID_DTYPE, CHUNK_SHAPE, ArrayChunkSource,
+                                 ChunkSourceProtocol)
+
+# a save is a directory holding
+#   world.json          dims, region size and the name of every saved block id
+#   <rx>.<ry>.<rz>.region  the chunks of one region of size ** 3 chunks
+# a region file starts with HEADER (magic, version, region size) and two
+# tables, each a TABLE_HEADER (generation, crc32 of the generation and
+# entries) and size ** 3 (offset, length) entries, one per chunk in x, y, z
+# order (length 0 for absent chunks); the chunk payloads follow. the intact
+# table with the highest generation is current (see RegionFile.commit)
+# a payload is one kind byte followed by
+#   KIND_UNIFORM  the id filling the chunk
+#   KIND_PALETTE  a compression byte (see COMPRESSIONS) and, compressed with it,
+#                 index bits, palette length, the palette of saved ids and the
+#                 palette index of every block in ArrayChunkSource.ids order,
+#                 bit packed lowest bits first (no indices for 0 bits)
+#   KIND_IDS      CHUNK_SIZE ids in ArrayChunkSource.ids order (older saves)
+# all little endian
+# whole saves are written to a sibling <path>.new directory and swapped in for
+# the directory at path, which sits at <path>.old meanwhile (see WorldSave.create)
+MAGIC = b"TXRG"
+VERSION = 2
+HEADER = struct.Struct("<4sHH")
+TABLE_HEADER = struct.Struct("<II")
+TABLE_DTYPE = np.dtype([("offset", "<u4"), ("length", "<u4")])
+WORLD_FILE = "world.json"
+STAGING_SUFFIX = ".new"
+RETIRED_SUFFIX = ".old"
+
+KIND_UNIFORM = 0
+KIND_IDS = 1
+KIND_PALETTE = 2
+_UNIFORM = struct.Struct("<BH")
+_PALETTE = struct.Struct("<BB")
+_PALETTE_BODY = struct.Struct("<BH")
+_IDS_DTYPE = np.dtype("<u2")
+
+# lzma without a container, with a window no bigger than a chunk needs
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6, "dict_size": 1 << 16}]
+
+# compression byte and (compress, decompress) of chunk payload bodies, by config name
+COMPRESSIONS: dict[str, tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (0, bytes, bytes),
+    "zlib": (1, lambda data: zlib.compress(data, 6, -15), lambda data: zlib.decompress(data, -15)),
+    "lzma": (2, lambda data: lzma.compress(data, lzma.FORMAT_RAW, filters=_LZMA_FILTERS),
+             lambda data: lzma.decompress(data, lzma.FORMAT_RAW, filters=_LZMA_FILTERS))
+    }
+_DECOMPRESSORS = {code: decompress for code, _, decompress in COMPRESSIONS.values()}
+
+# region files are rewritten without their dead payloads once those outweigh
+# the live ones and this many bytes
+COMPACT_MIN_BYTES = 1 << 16
+
+_REGION_NAME = re.compile(r"^(-?\d+)\.(-?\d+)\.(-?\d+)\.region$")
+
+RegionFileLocation = tuple[int, int, int]
+
+
+def region_file_location(chunkloc: ChunkLocation, size: int) -> RegionFileLocation:
+    return chunkloc[0] // size, chunkloc[1] // size, chunkloc[2] // size
+
+def region_file_name(location: RegionFileLocation) -> str:
+    return "{}.{}.{}.region".format(*location)
+
+def _region_files(path: str) -> dict[RegionFileLocation, str]:
+    "the region files in the save directory at path, by location"
+    files = {}
+    for name in os.listdir(path):
+        match = _REGION_NAME.match(name)
+        if match is not None:
+            files[tuple(int(group) for group in match.groups())] = os.path.join(path, name)
+    return files  # type: ignore
+
+def _slot(chunkloc: ChunkLocation, size: int) -> int:
+    "index of chunkloc in the table of its region file"
+    return ((chunkloc[0] % size) * size + chunkloc[1] % size) * size + chunkloc[2] % size
+
+def _table_offset(table: int, size: int) -> int:
+    return HEADER.size + table * (TABLE_HEADER.size + size ** 3 * TABLE_DTYPE.itemsize)
+
+def _packed_table(generation: int, table: np.ndarray) -> bytes:
+    entries = table.tobytes()
+    return TABLE_HEADER.pack(generation, zlib.crc32(struct.pack("<I", generation) + entries)) + entries
+
+def _write_durably(file, data: bytes):
+    file.write(data)
+    file.flush()
+    os.fsync(file.fileno())
+
+def _sync_directory(path: str):
+    "make the entries of the directory at path (files renamed into it) durable"
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        # directories cannot be opened on windows, which syncs renames itself
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def _replace_durably(source: str, destination: str):
+    os.replace(source, destination)
+    _sync_directory(os.path.dirname(os.path.abspath(destination)))
+
+def recover_save(path: str) -> bool:
+    """finish or undo a whole save at path interrupted by a crash (see WorldSave.create)
+    and remove what it left behind; return whether a save directory is at path
+
+    a staged or retired directory is complete once it holds WORLD_FILE, which
+    is written last; the staged one is newer, so it wins when path is missing"""
+    path = os.path.normpath(path)
+    staging, retired = path + STAGING_SUFFIX, path + RETIRED_SUFFIX
+    if not os.path.isdir(path):
+        for complete in (staging, retired):
+            if os.path.isfile(os.path.join(complete, WORLD_FILE)):
+                _replace_durably(complete, path)
+                break
+    for leftover in (staging, retired):
+        if os.path.isdir(leftover):
+            shutil.rmtree(leftover)
+    return os.path.isdir(path)
+
+def _index_bits(count: int) -> int:
+    "bits per palette index for a palette of count ids"
+    for bits in (0, 1, 2, 4, 8):
+        if count <= 1 << bits:
+            return bits
+    return 16
+
+# shift of every index packed into one byte, by bits per index
+_SHIFTS = {bits: np.arange(0, 8, bits, dtype=np.uint8) for bits in (1, 2, 4)}
+
+def pack_indices(indices: np.ndarray, bits: int) -> bytes:
+    "pack indices (each below 1 << bits) into bits each, lowest bits first"
+    if bits == 0:
+        return b""
+    if bits >= 8:
+        return np.ascontiguousarray(indices, np.uint8 if bits == 8 else _IDS_DTYPE).tobytes()
+    shifts = _SHIFTS[bits]
+    grouped = indices.astype(np.uint8).reshape(-1, len(shifts)) << shifts
+    return np.bitwise_or.reduce(grouped, axis=1).tobytes()
+
+def unpack_indices(data: bytes, bits: int, count: int) -> np.ndarray:
+    "return count indices packed into data by pack_indices"
+    if bits == 0:
+        return np.zeros(count, np.uint8)
+    if bits >= 8:
+        return np.frombuffer(data, np.uint8 if bits == 8 else _IDS_DTYPE, count)
+    shifts = _SHIFTS[bits]
+    packed = np.frombuffer(data, np.uint8, count // len(shifts))
+    return ((packed[:, None] >> shifts) & ((1 << bits) - 1)).ravel()
+
+def encode_chunk(chunk: ChunkSourceProtocol, to_saved: np.ndarray | None = None, compression: str = SAVE_COMPRESSION) -> bytes:
+    """return the payload of chunk
+    to_saved maps registry ids to saved ids (None when they are the same);
+    compression names one of COMPRESSIONS"""
+    uniform = chunk.uniform
+    if uniform is not None:
+        return _UNIFORM.pack(KIND_UNIFORM, uniform if to_saved is None else to_saved[uniform])
+    code, compress, _ = COMPRESSIONS[compression]
+    ids = chunk.as_array().ravel()
+    # ids present, in order, and the palette index of every id
+    counts = np.bincount(ids)
+    palette = np.flatnonzero(counts)
+    lookup = np.zeros(len(counts), _IDS_DTYPE)
+    lookup[palette] = np.arange(len(palette))
+    if to_saved is not None:
+        palette = to_saved[palette]
+    bits = _index_bits(len(palette))
+    body = b"".join((
+        _PALETTE_BODY.pack(bits, len(palette)),
+        np.ascontiguousarray(palette, _IDS_DTYPE).tobytes(),
+        pack_indices(lookup[ids], bits)
+        ))
+    compressed = compress(body)
+    if len(compressed) >= len(body):
+        # stored as is when compression does not pay off
+        code, compressed = COMPRESSIONS["none"][0], body
+    return _PALETTE.pack(KIND_PALETTE, code) + compressed
+
+def decode_chunk(payload: bytes, remap: np.ndarray | None = None) -> ArrayChunkSource:
+    """return the chunk stored in payload
+    remap maps saved ids to registry ids (None when they are the same)"""
+    kind = payload[0]
+    if kind == KIND_UNIFORM:
+        _, block_id = _UNIFORM.unpack_from(payload)
+        return ArrayChunkSource(None, [], int(block_id if remap is None else remap[block_id]))
+    if kind == KIND_PALETTE:
+        body = _DECOMPRESSORS[payload[1]](payload[_PALETTE.size:])
+        bits, count = _PALETTE_BODY.unpack_from(body)
+        palette = np.frombuffer(body, _IDS_DTYPE, count, _PALETTE_BODY.size)
+        palette = palette.astype(BLOCK_ID_DTYPE) if remap is None else remap[palette]
+        indices = unpack_indices(body[_PALETTE_BODY.size + palette.nbytes:], bits, CHUNK_SIZE)
+        return ArrayChunkSource(palette[indices].reshape(CHUNK_SHAPE), [])
+    if kind == KIND_IDS:
+        ids = np.frombuffer(payload, _IDS_DTYPE, CHUNK_SIZE, 1)
+        ids = ids.astype(BLOCK_ID_DTYPE) if remap is None else remap[ids]
+        return ArrayChunkSource(ids.reshape(CHUNK_SHAPE), [])
+    raise ValueError(f"unknown chunk payload kind {kind}")
+
+
+class RegionFile:
+    """One region file of a save
+
+    only the header and tables are read on opening; read maps the file into
+    memory (on first use) and copies out the payload of a single chunk.
+    commit appends changed payloads after everything else and only then
+    writes them into the table not in use, so a save interrupted at any point
+    leaves the previous table, and every payload it points to, intact
+    """
+
+    path: str
+    location: RegionFileLocation
+    size: int
+    table: np.ndarray
+    generation: int
+    # which of the two tables is current
+    current: int
+
+    def __init__(self, path: str, location: RegionFileLocation):
+        self.path = path
+        self.location = location
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: mmap.mmap | None = None
+        with open(path, "rb") as file:
+            self._read_tables(file)
+
+    def _read_tables(self, file):
+        magic, version, self.size = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} region file")
+        entries = self.size ** 3 * TABLE_DTYPE.itemsize
+        best = None
+        for table in range(2):
+            generation, crc = TABLE_HEADER.unpack(file.read(TABLE_HEADER.size))
+            raw = file.read(entries)
+            if zlib.crc32(struct.pack("<I", generation) + raw) == crc and (best is None or generation > best[0]):
+                best = generation, table, raw
+        if best is None:
+            raise ValueError(f"{self.path} has no intact table")
+        self.generation, self.current, raw = best
+        self.table = np.frombuffer(raw, TABLE_DTYPE).copy()
+
+    @property
+    def data_start(self) -> int:
+        "offset of the first payload"
+        return _table_offset(2, self.size)
+
+    def chunk_locations(self) -> list[ChunkLocation]:
+        "locations of every chunk stored in the file"
+        size = self.size
+        rx, ry, rz = self.location
+        slots = np.nonzero(self.table["length"])[0]
+        xs, ys, zs = np.unravel_index(slots, (size, size, size))
+        return list(zip((xs + rx * size).tolist(), (ys + ry * size).tolist(), (zs + rz * size).tolist()))
+
+    def read(self, chunkloc: ChunkLocation) -> bytes | None:
+        "return the payload of chunkloc, None if it is not stored"
+        with self._lock:
+            return self._read_slot(_slot(chunkloc, self.size))
+
+    def _read_slot(self, slot: int) -> bytes | None:
+        offset, length = self.table[slot].tolist()
+        if not length:
+            return None
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length]
+
+    def close(self):
+        "unmap the file (it is mapped again by the next read)"
+        with self._lock:
+            self._close_map()
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()  # type: ignore
+            self._map = self._file = None
+
+    def commit(self, payloads: dict[ChunkLocation, bytes | None]) -> int:
+        """store payloads (by chunk location, None to remove a chunk) in the file
+        return the number of bytes written"""
+        with self._lock:
+            table = self.table.copy()
+            # offsets are filled in as the payloads are placed
+            for chunkloc, payload in payloads.items():
+                table[_slot(chunkloc, self.size)] = 0, (0 if payload is None else len(payload))
+            live = int(table["length"].sum())
+            end = os.path.getsize(self.path)
+            added = sum(len(payload) for payload in payloads.values() if payload is not None)
+            if end + added - self.data_start - live > max(live, COMPACT_MIN_BYTES):
+                return self._compact(payloads)
+
+            # the map is dropped while the file grows (required on windows)
+            self._close_map()
+            with open(self.path, "r+b") as file:
+                file.seek(end)
+                for chunkloc, payload in payloads.items():
+                    if payload is not None:
+                        table[_slot(chunkloc, self.size)] = end, len(payload)
+                        end += len(payload)
+                _write_durably(file, b"".join(payload for payload in payloads.values() if payload is not None))
+                spare = 1 - self.current
+                file.seek(_table_offset(spare, self.size))
+                packed = _packed_table(self.generation + 1, table)
+                _write_durably(file, packed)
+            self.table, self.generation, self.current = table, self.generation + 1, spare
+            return added + len(packed)
+
+    def _compact(self, payloads: dict[ChunkLocation, bytes | None]) -> int:
+        "rewrite the file holding only its live payloads and payloads, return the bytes written"
+        size = self.size
+        rx, ry, rz = self.location
+        merged: dict[ChunkLocation, bytes] = {}
+        for slot in np.nonzero(self.table["length"])[0].tolist():
+            x, y, z = np.unravel_index(slot, (size, size, size))
+            chunkloc = int(x) + rx * size, int(y) + ry * size, int(z) + rz * size
+            if chunkloc not in payloads:
+                merged[chunkloc] = self._read_slot(slot)  # type: ignore
+        merged.update((chunkloc, payload) for chunkloc, payload in payloads.items() if payload is not None)
+        self._close_map()
+        written = RegionFile.write(self.path, size, merged)
+        with open(self.path, "rb") as file:
+            self._read_tables(file)
+        return written
+
+    @staticmethod
+    def write(path: str, size: int, payloads: dict[ChunkLocation, bytes]) -> int:
+        """write the payloads (by chunk location, all inside one region) as a new
+        region file at path, replacing any file there; return the bytes written"""
+        table = np.zeros(size ** 3, TABLE_DTYPE)
+        offset = _table_offset(2, size)
+        for chunkloc, payload in payloads.items():
+            table[_slot(chunkloc, size)] = offset, len(payload)
+            offset += len(payload)
+        data = b"".join([
+            HEADER.pack(MAGIC, VERSION, size),
+            _packed_table(1, table),
+            _packed_table(0, np.zeros_like(table)),
+            *payloads.values()
+            ])
+        # write next to the file and swap it in, so a crash never leaves half a region
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            _write_durably(file, data)
+        _replace_durably(temporary, path)
+        return len(data)
+
+
+class WorldSave:
+    """A save directory (see the layout above)
+
+    read on demand through SavedChunkIndex and written back chunk by chunk
+    with commit; blocks registered since the save was made get new saved
+    ids, so the ids already in its region files keep their meaning
+    """
+
+    path: str
+    dims: tuple[int, int]
+    region_size: int
+    # block name of every saved id
+    names: list[str]
+    regions: dict[RegionFileLocation, RegionFile]
+    # saved id -> registry id and registry id -> saved id
+    _to_registry: np.ndarray
+    _to_saved: np.ndarray
+    _names_written: int
+
+    def __init__(self, path: str):
+        self.path = path
+        recover_save(path)
+        with open(os.path.join(path, WORLD_FILE), "r") as file:
+            world = json.load(file)
+        self.dims = tuple(world["dims"])  # type: ignore
+        self.region_size = world["region_size"]
+        self.names = list(world["blocks"])
+        self._names_written = len(self.names)
+        self._to_registry = np.array([REGISTRY.by_name(name).block_id for name in self.names], BLOCK_ID_DTYPE)
+        self._to_saved = np.zeros(0, BLOCK_ID_DTYPE)
+        self.regions = {location: RegionFile(file, location) for location, file in _region_files(path).items()}
+
+    @classmethod
+    def create(cls, path: str, chunks: Iterable[tuple[ChunkLocation, ChunkSourceProtocol]], dims: tuple[int, int], region_size: int = SAVE_REGION_SIZE) -> tuple[WorldSave, int]:
+        """write chunks as a new save directory at path (replacing any save there)
+        and return it opened, with the number of bytes written
+
+        the save is written whole to a staging directory next to path and then
+        renamed to path, so a crash leaves either the old save or the new one
+        (see recover_save), never regions of one beside the name table of the other"""
+        recover_save(path)
+        target = os.path.normpath(path)
+        staging, retired = target + STAGING_SUFFIX, target + RETIRED_SUFFIX
+        os.makedirs(staging)
+        regions: dict[RegionFileLocation, dict[ChunkLocation, bytes]] = {}
+        for chunkloc, chunk in chunks:
+            regions.setdefault(region_file_location(chunkloc, region_size), {})[chunkloc] = encode_chunk(chunk)
+        written = 0
+        for location, payloads in regions.items():
+            written += RegionFile.write(os.path.join(staging, region_file_name(location)), region_size, payloads)
+        # last, marking the staged save complete
+        written += _write_world(staging, dims, region_size, [block.name for block in REGISTRY.blocks])
+        if os.path.isdir(target):
+            _replace_durably(target, retired)
+        _replace_durably(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
+        return cls(path), written
+
+    @property
+    def remap(self) -> np.ndarray | None:
+        "saved id -> registry id, None when they are the same"
+        if np.array_equal(self._to_registry, np.arange(len(self._to_registry))):
+            return None
+        return self._to_registry
+
+    def to_saved(self) -> np.ndarray | None:
+        """registry id -> saved id, None when they are the same
+        registered blocks the save has no id for yet are given one"""
+        if len(self._to_saved) != len(REGISTRY):
+            saved = {name: saved_id for saved_id, name in enumerate(self.names)}
+            for block in REGISTRY.blocks[len(self._to_saved):]:
+                if block.name not in saved:
+                    saved[block.name] = len(self.names)
+                    self.names.append(block.name)
+            self._to_saved = np.array([saved[block.name] for block in REGISTRY.blocks], BLOCK_ID_DTYPE)
+            self._to_registry = np.array([REGISTRY.by_name(name).block_id for name in self.names], BLOCK_ID_DTYPE)
+        if np.array_equal(self._to_saved, np.arange(len(self._to_saved))):
+            return None
+        return self._to_saved
+
+    def encode(self, chunk: ChunkSourceProtocol) -> bytes:
+        "return the payload of chunk in this save's ids"
+        return encode_chunk(chunk, self.to_saved())
+
+    def chunk_locations(self) -> list[ChunkLocation]:
+        return [chunkloc for region in self.regions.values() for chunkloc in region.chunk_locations()]
+
+    def load_chunk(self, chunkloc: ChunkLocation) -> ArrayChunkSource | None:
+        region = self.regions.get(region_file_location(chunkloc, self.region_size))
+        payload = None if region is None else region.read(chunkloc)
+        if payload is None:
+            return None
+        return decode_chunk(payload, self.remap)
+
+    def commit(self, payloads: dict[ChunkLocation, bytes | None], dims: tuple[int, int]) -> int:
+        """store payloads (from encode, by chunk location; None removes a chunk)
+        return the number of bytes written"""
+        if not payloads and dims == self.dims:
+            return 0
+        written = 0
+        if len(self.names) != self._names_written or dims != self.dims:
+            # ids are only ever added, so the new name table also fits the current region tables
+            written += _write_world(self.path, dims, self.region_size, self.names)
+            self.dims = dims
+            self._names_written = len(self.names)
+        regions: dict[RegionFileLocation, dict[ChunkLocation, bytes | None]] = {}
+        for chunkloc, payload in payloads.items():
+            regions.setdefault(region_file_location(chunkloc, self.region_size), {})[chunkloc] = payload
+        for location, region_payloads in regions.items():
+            region = self.regions.get(location)
+            if region is not None:
+                written += region.commit(region_payloads)
+                continue
+            added = {chunkloc: payload for chunkloc, payload in region_payloads.items() if payload is not None}
+            if added:
+                file = os.path.join(self.path, region_file_name(location))
+                written += RegionFile.write(file, self.region_size, added)
+                self.regions[location] = RegionFile(file, location)
+        return written
+
+    def close(self):
+        "unmap every region file"
+        for region in self.regions.values():
+            region.close()
+
+
+@dataclass
+class SaveSnapshot:
+    """The chunks one save writes, as they were when it began (see Model.begin_save)
+
+    the chunk objects are shared with the model until it edits them, when the
+    model edits a copy instead; so write can run on any thread
+    """
+    path: str
+    # None for a chunk that was removed
+    chunks: dict[ChunkLocation, ChunkSourceProtocol | None]
+    dims: tuple[int, int]
+    # the save to commit the chunks to, None to create a whole new save at path
+    world_save: WorldSave | None
+
+    @property
+    def full(self) -> bool:
+        return self.world_save is None
+
+    def write(self) -> tuple[WorldSave, int]:
+        "encode and write the chunks, return the save written to and the number of bytes written"
+        if self.world_save is None:
+            return WorldSave.create(self.path, ((chunkloc, chunk) for chunkloc, chunk in self.chunks.items() if chunk is not None), self.dims)
+        world_save = self.world_save
+        return world_save, world_save.commit({
+            chunkloc: None if chunk is None else world_save.encode(chunk)
+            for chunkloc, chunk in self.chunks.items()
+            }, self.dims)
+
+
+def _write_world(path: str, dims: tuple[int, int], region_size: int, names: list[str]) -> int:
+    data = json.dumps({
+        "version": VERSION,
+        "dims": list(dims),
+        "region_size": region_size,
+        "blocks": names
+        }).encode()
+    temporary = os.path.join(path, WORLD_FILE + ".tmp")
+    with open(temporary, "wb") as file:
+        _write_durably(file, data)
+    _replace_durably(temporary, os.path.join(path, WORLD_FILE))
+    return len(data)
+
+
+class SavedChunkIndex(ChunkIndex[ChunkSourceProtocol]):
+    """ChunkIndex over a WorldSave, reading each chunk the first time it is indexed
+
+    chunks not yet read still count as resident (locations, len, in); items
+    and values read every chunk. safe to index from the mesh pool's threads
+    """
+
+    save: WorldSave | None
+    _unloaded: set[ChunkLocation]
+
+    def __init__(self, save: WorldSave):
+        super().__init__()
+        self.save = save
+        self._unloaded = set(save.chunk_locations())
+        self._lock = threading.Lock()
+
+    def __getitem__(self, chunkloc: ChunkLocation) -> ChunkSourceProtocol | None:
+        if chunkloc in self._unloaded:
+            self._load(chunkloc)
+        return self._chunks.get(chunkloc)
+
+    def _load(self, chunkloc: ChunkLocation):
+        with self._lock:
+            if chunkloc not in self._unloaded:
+                # read by another thread meanwhile
+                return
+            chunk = self.save.load_chunk(chunkloc)  # type: ignore
+            if chunk is not None:
+                self._chunks[chunkloc] = chunk
+            self._unloaded.discard(chunkloc)
+            if not self._unloaded:
+                self.close()
+
+    def __setitem__(self, chunkloc: ChunkLocation, value: ChunkSourceProtocol | None):
+        with self._lock:
+            self._unloaded.discard(chunkloc)
+        super().__setitem__(chunkloc, value)
+
+    def __delitem__(self, chunkloc: ChunkLocation):
+        self[chunkloc] = None
+
+    def __contains__(self, chunkloc: ChunkLocation) -> bool:
+        return chunkloc in self._chunks or chunkloc in self._unloaded
+
+    def __len__(self) -> int:
+        return len(self._chunks) + len(self._unloaded)
+
+    def __iter__(self) -> Iterator[ChunkLocation]:
+        return iter(self.locations())
+
+    def pop(self, chunkloc: ChunkLocation) -> ChunkSourceProtocol | None:
+        chunk = self[chunkloc]
+        super().pop(chunkloc)
+        return chunk
+
+    def locations(self) -> AbstractSet[ChunkLocation]:
+        if not self._unloaded:
+            return self._chunks.keys()
+        return self._chunks.keys() | self._unloaded
+
+    def load_all(self):
+        "read every chunk not read yet"
+        for chunkloc in list(self._unloaded):
+            self._load(chunkloc)
+
+    def values(self) -> ValuesView[ChunkSourceProtocol]:
+        self.load_all()
+        return super().values()
+
+    def items(self) -> ItemsView[ChunkLocation, ChunkSourceProtocol]:
+        self.load_all()
+        return super().items()
+
+    def clear(self):
+        with self._lock:
+            self._unloaded.clear()
+        self.close()
+        super().clear()
+
+    def close(self):
+        "stop reading from the save, unmapping its files"
+        if self.save is not None:
+            self.save.close()
+            self.save = None
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import heapq
+import os
+import time
+from itertools import count
+from typing import Callable, Iterable, Sequence
+
+from maths.constants import CHUNK_RADIUS, MESH_FRAME_BUDGET, MESH_WORKERS
+from maths.types import ChunkLocation
+
+
+class MeshScheduler:
+    """Queue of chunk remeshes drained a little every frame
+
+    requests for a chunk already queued are merged; chunks nearest the focus
+    (the camera) are remeshed first, in batches handed to update (which may
+    mesh the batch in parallel or off the main thread, see Model.submit_chunks)
+
+    run stops starting batches once budget seconds have passed, or once ready
+    (if given) returns False, so a load or a burst of edits is spread over
+    several frames instead of stalling one
+    """
+
+    update: Callable[[list[ChunkLocation]], None]
+    ready: Callable[[], bool] | None
+    budget: float
+    batch_size: int
+    focus: tuple[float, float, float] | None
+
+    _heap: list[tuple[float, int, ChunkLocation]]
+    _queued: set[ChunkLocation]
+    _order: count
+
+    def __init__(
+            self,
+            update: Callable[[list[ChunkLocation]], None],
+            budget_ms: float = MESH_FRAME_BUDGET,
+            batch_size: int = MESH_WORKERS or os.cpu_count() or 1,
+            ready: Callable[[], bool] | None = None
+            ):
+        self.update = update
+        self.ready = ready
+        self.budget = budget_ms / 1000.
+        self.batch_size = batch_size
+        self.focus = None
+        self._heap = []
+        self._queued = set()
+        self._order = count()
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __contains__(self, chunkloc: ChunkLocation) -> bool:
+        return chunkloc in self._queued
+
+    def priority(self, chunkloc: ChunkLocation) -> float:
+        "squared distance from the focus to the centre of chunkloc (0 without a focus)"
+        if self.focus is None:
+            return 0.
+        return sum(((c + 0.5) * CHUNK_RADIUS - f) ** 2 for c, f in zip(chunkloc, self.focus))
+
+    def request(self, chunkloc: ChunkLocation):
+        "queue a remesh of chunkloc (no-op if one is already queued)"
+        if chunkloc in self._queued:
+            return
+        self._queued.add(chunkloc)
+        heapq.heappush(self._heap, (self.priority(chunkloc), next(self._order), chunkloc))
+
+    def request_many(self, chunklocs: Iterable[ChunkLocation]):
+        for chunkloc in chunklocs:
+            self.request(chunkloc)
+
+    def discard(self, chunkloc: ChunkLocation):
+        "drop a queued remesh of chunkloc"
+        # its heap entry is skipped when popped
+        self._queued.discard(chunkloc)
+
+    def clear(self):
+        self._heap.clear()
+        self._queued.clear()
+
+    def set_focus(self, position: Sequence[float]):
+        "prioritise chunks near position, reordering the queue if it moved to another chunk"
+        focus = (float(position[0]), float(position[1]), float(position[2]))
+        if self.focus is not None and all(
+                a // CHUNK_RADIUS == b // CHUNK_RADIUS for a, b in zip(focus, self.focus)):
+            self.focus = focus
+            return
+        self.focus = focus
+        self._heap = [(self.priority(chunkloc), order, chunkloc) for _, order, chunkloc in self._heap
+                      if chunkloc in self._queued]
+        heapq.heapify(self._heap)
+
+    def pop_batch(self, size: int) -> list[ChunkLocation]:
+        "remove and return up to size of the highest priority queued chunks"
+        batch: list[ChunkLocation] = []
+        while self._heap and len(batch) < size:
+            _, _, chunkloc = heapq.heappop(self._heap)
+            if chunkloc in self._queued:
+                self._queued.remove(chunkloc)
+                batch.append(chunkloc)
+        return batch
+
+    def run(self, dt: float | None = None) -> int:
+        """remesh queued chunks until the budget is spent (at least one batch) or
+        until update is not ready for more
+        return the number of chunks remeshed; dt is ignored (pyglet clock signature)"""
+        start = time.perf_counter()
+        done = 0
+        while self._queued and (self.ready is None or self.ready()):
+            batch = self.pop_batch(self.batch_size)
+            self.update(batch)
+            done += len(batch)
+            if time.perf_counter() - start >= self.budget:
+                break
+        return done
+
+    def run_all(self):
+        "hand every queued chunk to update now"
+        while self._queued:
+            self.update(self.pop_batch(len(self._queued)))
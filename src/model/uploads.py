@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from itertools import count
+from typing import Callable, Iterable
+
+from maths.constants import MESH_UPLOAD_BUDGET, MESH_WORKERS
+from maths.types import ChunkLocation
+
+from model.mesher import MeshData, get_mesh_pool, get_mesh_tables
+
+ChunkMeshes = tuple[MeshData, MeshData]
+
+
+class MeshUploads:
+    """Chunk meshes built on the mesh pool, waiting to be uploaded
+
+    submit starts building the (solid, fluid) meshes of chunks off the main
+    thread; finished meshes queue up until drain hands them to upload (on the
+    thread owning the gl context) in the order they finished, stopping once
+    budget bytes were uploaded in that call. a chunk keeps its current display
+    until its new mesh is uploaded
+
+    every build holds a ticket; cancelling a chunk (its data changed after the
+    build started) drops the ticket so the stale mesh is never uploaded
+    """
+
+    build: Callable[[ChunkLocation], ChunkMeshes]
+    # uploads the meshes of a chunk, returning the bytes uploaded
+    upload: Callable[[ChunkLocation, MeshData, MeshData], int]
+    budget: int
+    # most chunks building or waiting for upload at once
+    limit: int
+
+    _tickets: dict[ChunkLocation, int]
+    # appended to from the mesh pool's threads, which notify _completed_changed
+    _completed: deque[tuple[ChunkLocation, int, Future]]
+    _completed_changed: threading.Condition
+    # builds not yet drained, cancelled ones included
+    _running: set[Future]
+    _order: count
+
+    def __init__(
+            self,
+            build: Callable[[ChunkLocation], ChunkMeshes],
+            upload: Callable[[ChunkLocation, MeshData, MeshData], int],
+            budget: int = MESH_UPLOAD_BUDGET,
+            limit: int = 4 * (MESH_WORKERS or os.cpu_count() or 1)
+            ):
+        self.build = build
+        self.upload = upload
+        self.budget = budget
+        self.limit = limit
+        self._tickets = {}
+        self._completed = deque()
+        self._completed_changed = threading.Condition()
+        self._running = set()
+        self._order = count()
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, chunkloc: ChunkLocation) -> bool:
+        "whether a mesh of chunkloc is building or waiting for upload"
+        return chunkloc in self._tickets
+
+    @property
+    def ready(self) -> bool:
+        "whether there is room to submit more chunks"
+        return len(self._running) < self.limit
+
+    def submit(self, chunklocs: Iterable[ChunkLocation]):
+        "start building the meshes of chunklocs, superseding builds already running for them"
+        # build the tables here rather than racing to in every worker
+        get_mesh_tables()
+        pool = get_mesh_pool()
+        for chunkloc in chunklocs:
+            ticket = self._tickets[chunkloc] = next(self._order)
+            future = pool.submit(self.build, chunkloc)
+            self._running.add(future)
+            future.add_done_callback(lambda future, chunkloc=chunkloc, ticket=ticket:
+                                     self._complete(chunkloc, ticket, future))
+
+    def _complete(self, chunkloc: ChunkLocation, ticket: int, future: Future):
+        with self._completed_changed:
+            self._completed.append((chunkloc, ticket, future))
+            self._completed_changed.notify_all()
+
+    def cancel(self, chunkloc: ChunkLocation):
+        "drop the mesh of chunkloc being built or waiting for upload, if any"
+        self._tickets.pop(chunkloc, None)
+
+    def clear(self):
+        self._tickets.clear()
+
+    def drain(self, budget: int | None = None) -> int:
+        """upload finished meshes until budget bytes (default self.budget, 0 for
+        no limit) have been uploaded; at least one mesh is uploaded if any is ready
+        return the number of chunks uploaded"""
+        budget = self.budget if budget is None else budget
+        uploaded = 0
+        spent = 0
+        while self._completed and (budget <= 0 or spent < budget):
+            chunkloc, ticket, future = self._completed.popleft()
+            self._running.discard(future)
+            # raises here, on the main thread, if the build failed
+            mesh, fluid_mesh = future.result()
+            if self._tickets.get(chunkloc) != ticket:
+                # cancelled or superseded
+                continue
+            del self._tickets[chunkloc]
+            spent += self.upload(chunkloc, mesh, fluid_mesh)
+            uploaded += 1
+        return uploaded
+
+    def finish(self) -> int:
+        "wait for every running build and upload all of them, return the number of chunks uploaded"
+        uploaded = 0
+        while self._running:
+            # every running build is queued on _completed by its done callback
+            with self._completed_changed:
+                self._completed_changed.wait_for(lambda: len(self._completed) >= len(self._running))
+            uploaded += self.drain(0)
+        return uploaded
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import numpy as np
+from pyglet.gl import GL_QUADS  # type: ignore
+from pyglet.graphics import Batch, Group  # type: ignore
+from pyglet.graphics.vertexdomain import VertexList  # type: ignore
+
+from model.mesher import MeshData
+
+# pyglet attribute names by format letter
+_ATTRIBUTE_NAMES = {"v": "vertices", "t": "tex_coords", "c": "colors", "n": "normals"}
+
+
+def mesh_formats(mesh: MeshData, packed: bool = False) -> dict[str, np.ndarray]:
+    "return the per vertex arrays of mesh keyed by pyglet attribute format"
+    # pyglet 1.5 cannot interleave generic attributes into static buffers
+    if packed:
+        # drawn per chunk with its origin set (see DebugWindow.on_draw)
+        corners, uvs = mesh.packed()
+        return {"0g4B/dynamic": corners, "1g2B/dynamic": uvs}
+    formats = {
+        "v3f/static": mesh.vertices,
+        "t2f/static": mesh.tex_coords,
+        "c4B/static": mesh.colours,
+        "n3f/static": mesh.normals
+        }
+    if mesh.tiles is not None:
+        # texture tile origins for the block shader (GREEDY_MESHING)
+        formats["1g2f/dynamic"] = mesh.tiles
+    return formats
+
+def _attribute(vertex_list: VertexList, fmt: str):
+    names = vertex_list.domain.attribute_names
+    name = fmt.partition("/")[0]
+    if "g" in name:
+        return names["generic"][int(name.partition("g")[0])]
+    return names[_ATTRIBUTE_NAMES[name[0]]]
+
+def write_vertices(vertex_list: VertexList, formats: dict[str, np.ndarray], first: int = 0):
+    """copy the arrays of formats (see mesh_formats) into vertex_list from vertex first
+
+    each buffer of the domain is written with one memmove; attributes sharing
+    an interleaved (static) buffer are interleaved into a byte array first"""
+    count = len(next(iter(formats.values())))
+    if count == 0:
+        return
+    buffers: dict[int, tuple] = {}
+    for fmt, array in formats.items():
+        attribute = _attribute(vertex_list, fmt)
+        buffers.setdefault(id(attribute.buffer), (attribute.buffer, []))[1].append((attribute, array))
+    for buffer, attributes in buffers.values():
+        stride = attributes[0][0].stride
+        if len(attributes) == 1 and attributes[0][0].size == stride:
+            attribute, array = attributes[0]
+            data = np.ascontiguousarray(array, np.dtype(attribute.c_type))
+        else:
+            data = np.zeros((count, stride), np.uint8)
+            for attribute, array in attributes:
+                values = np.ascontiguousarray(array, np.dtype(attribute.c_type))
+                data[:, attribute.offset:attribute.offset + attribute.size] = values.view(np.uint8).reshape(count, -1)
+        buffer.set_data_region(data.ctypes.data, (vertex_list.start + first) * stride, count * stride)
+
+def vertex_list_bytes(vertex_list: VertexList) -> int:
+    """bytes of vertex data held by vertex_list
+    counted per buffer: pyglet 1.5 lists interleaved (static) attributes twice
+    in domain.attributes"""
+    return vertex_list.get_size() * sum(buffer.element_size for buffer, _ in vertex_list.domain.buffer_attributes)
+
+def add_mesh(batch: Batch, group: Group, mesh: MeshData, packed: bool = False) -> VertexList:
+    "add mesh to batch as GL_QUADS, copying its arrays straight into the new vertex list"
+    formats = mesh_formats(mesh, packed)
+    vertex_list = batch.add(mesh.count, GL_QUADS, group, *formats)
+    write_vertices(vertex_list, formats)
+    return vertex_list
+
+def patch_vertex_list(vertex_list: VertexList, quad_cells: np.ndarray, selected: np.ndarray, mesh: MeshData, packed: bool = False) -> np.ndarray:
+    """replace the quads of the selected cells in vertex_list with those of mesh
+    reusing unused quads first and growing the list when they run out
+    return the new cell of every quad; unused quads are left degenerate"""
+    quad_cells = np.array(quad_cells, np.int32)
+    stale = np.nonzero((quad_cells >= 0) & selected[np.maximum(quad_cells, 0)])[0]
+    quad_cells[stale] = -1
+    free = np.nonzero(quad_cells < 0)[0]
+    needed = len(mesh.cells)  # type: ignore
+    if needed > len(free):
+        old_count = len(quad_cells)
+        vertex_list.resize((old_count + needed - len(free)) * 4)
+        quad_cells = np.concatenate([quad_cells, np.full(needed - len(free), -1, np.int32)])
+        free = np.nonzero(quad_cells < 0)[0]
+    slots = free[:needed]
+    quad_cells[slots] = mesh.cells
+
+    formats = mesh_formats(mesh, packed)
+    for quad, slot in enumerate(slots.tolist()):
+        write_vertices(vertex_list, {fmt: array[quad * 4:quad * 4 + 4] for fmt, array in formats.items()}, slot * 4)
+    # collapse stale quads that were not reused onto one point
+    position_format, positions = next(iter(formats.items()))
+    collapsed = np.zeros((4, positions.shape[1]), positions.dtype)
+    for slot in np.setdiff1d(stale, slots).tolist():
+        write_vertices(vertex_list, {position_format: collapsed}, slot * 4)
+    return quad_cells
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import numpy as np
+from blocks.registry import REGISTRY
+from maths.constants import CHUNK_RADIUS, V_TABLE
+from maths.culling import Frustum
+from maths.types import ChunkLocation
+from numbawrapper import njit  # type: ignore
+
+from model.modelprotocol import ChunkSourceProtocol
+
+# chunk faces are indexed like maths.constants.V_TABLE (up, down, front, back,
+# left, right); the opposite of face f is f ^ 1
+# a connectivity mask has bit a * 6 + b set when faces a and b see each other
+# through transparent cells of the chunk
+OPEN: int = (1 << 36) - 1
+CLOSED: int = 0
+
+
+@njit
+def _flood_faces(open_cells: np.ndarray, seen: np.ndarray, stack: np.ndarray, sx: int, sy: int, sz: int) -> int:
+    "flood fill the open cells connected to (sx, sy, sz), returning the faces (bit per face) they touch"
+    size = open_cells.shape[0]
+    seen[sx, sy, sz] = True
+    stack[0, 0], stack[0, 1], stack[0, 2] = sx, sy, sz
+    top = 1
+    faces = 0
+    while top:
+        top -= 1
+        x, y, z = stack[top, 0], stack[top, 1], stack[top, 2]
+        # faces in V_TABLE order
+        if y == size - 1:
+            faces |= 1
+        if y == 0:
+            faces |= 2
+        if z == size - 1:
+            faces |= 4
+        if z == 0:
+            faces |= 8
+        if x == size - 1:
+            faces |= 16
+        if x == 0:
+            faces |= 32
+        for dx, dy, dz in ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)):
+            nx, ny, nz = x + dx, y + dy, z + dz
+            if 0 <= nx < size and 0 <= ny < size and 0 <= nz < size \
+                    and open_cells[nx, ny, nz] and not seen[nx, ny, nz]:
+                seen[nx, ny, nz] = True
+                stack[top, 0], stack[top, 1], stack[top, 2] = nx, ny, nz
+                top += 1
+    return faces
+
+@njit
+def _flood_connectivity(open_cells: np.ndarray) -> int:
+    "flood fill the open cells of a chunk, returning the connectivity mask of its faces"
+    size = open_cells.shape[0]
+    seen = np.zeros(open_cells.shape, np.bool_)
+    stack = np.empty((open_cells.size, 3), np.int64)
+    mask = 0
+    for sx in range(size):
+        for sy in range(size):
+            for sz in range(size):
+                if seen[sx, sy, sz] or not open_cells[sx, sy, sz]:
+                    continue
+                faces = _flood_faces(open_cells, seen, stack, sx, sy, sz)
+                for a in range(6):
+                    if faces & (1 << a):
+                        for b in range(6):
+                            if faces & (1 << b):
+                                mask |= 1 << (a * 6 + b)
+    return mask
+
+def chunk_connectivity(chunk: ChunkSourceProtocol | None) -> int:
+    "return which faces of chunk see each other (absent chunks are open)"
+    if chunk is None:
+        return OPEN
+    uniform = chunk.uniform
+    if uniform is not None:
+        return OPEN if REGISTRY.transparent[uniform] else CLOSED
+    return int(_flood_connectivity(REGISTRY.transparent[chunk.as_array()]))
+
+def exit_faces(chunk: ChunkSourceProtocol | None, offsets: tuple[int, int, int]) -> int:
+    """return the faces (bit per face) of chunk seen from the cell at offsets
+    every face when that cell is not open (the eye is inside a block)"""
+    if chunk is None or chunk.uniform is not None:
+        return (1 << 6) - 1
+    open_cells = REGISTRY.transparent[chunk.as_array()]
+    if not open_cells[offsets]:
+        return (1 << 6) - 1
+    seen = np.zeros(open_cells.shape, np.bool_)
+    stack = np.empty((open_cells.size, 3), np.int64)
+    return int(_flood_faces(open_cells, seen, stack, *offsets))
+
+@njit
+def _traverse(
+        masks: np.ndarray,
+        in_view: np.ndarray,
+        drawable: np.ndarray,
+        steps: np.ndarray,
+        sx: int, sy: int, sz: int,
+        start_faces: int
+        ) -> np.ndarray:
+    "breadth first traversal of reachable_chunks over grids of the extent, returning flat indices"
+    size_x, size_y, size_z = masks.shape
+    # a cell is expanded once per face it is entered by
+    visited = np.zeros((size_x, size_y, size_z, 6), np.bool_)
+    seen = np.zeros(masks.shape, np.bool_)
+    queue = np.empty(masks.size * 6 + 1, np.int64)
+    entered_by = np.empty(masks.size * 6 + 1, np.int8)
+    taken_by = np.empty(masks.size * 6 + 1, np.int8)
+    order = np.empty(masks.size, np.int64)
+    count = 0
+    queue[0] = (sx * size_y + sy) * size_z + sz
+    entered_by[0] = -1
+    taken_by[0] = 0
+    seen[sx, sy, sz] = True
+    if drawable[sx, sy, sz]:
+        order[0] = queue[0]
+        count = 1
+    head, tail = 0, 1
+    while head < tail:
+        index, entered, taken = queue[head], entered_by[head], taken_by[head]
+        head += 1
+        x, rest = divmod(index, size_y * size_z)
+        y, z = divmod(rest, size_z)
+        if entered < 0:
+            faces = start_faces
+        else:
+            mask = masks[x, y, z]
+            faces = 0
+            for face in range(6):
+                if mask >> (entered * 6 + face) & 1:
+                    faces |= 1 << face
+        for face in range(6):
+            if taken & (1 << (face ^ 1)) or not faces & (1 << face):
+                continue
+            nx, ny, nz = x + steps[face, 0], y + steps[face, 1], z + steps[face, 2]
+            if not (0 <= nx < size_x and 0 <= ny < size_y and 0 <= nz < size_z) or visited[nx, ny, nz, face ^ 1]:
+                continue
+            visited[nx, ny, nz, face ^ 1] = True
+            if not in_view[nx, ny, nz]:
+                continue
+            queue[tail] = (nx * size_y + ny) * size_z + nz
+            entered_by[tail] = face ^ 1
+            taken_by[tail] = taken | 1 << face
+            tail += 1
+            if not seen[nx, ny, nz]:
+                seen[nx, ny, nz] = True
+                if drawable[nx, ny, nz]:
+                    order[count] = queue[tail - 1]
+                    count += 1
+    return order[:count]
+
+_STEPS = np.array(V_TABLE, np.int64)
+
+def reachable_chunks(
+        start: ChunkLocation,
+        start_faces: int,
+        masks: np.ndarray,
+        drawable: np.ndarray,
+        frustum: Frustum,
+        low: ChunkLocation
+        ) -> list[ChunkLocation]:
+    """return the drawable chunks inside frustum that can be seen from start, nearest first
+
+    masks and drawable hold the connectivity (see chunk_connectivity) and
+    whether to return every chunk of the extent starting at low; chunks
+    outside it are not visited. breadth first from start, leaving start
+    through start_faces (see exit_faces) and every other chunk only through
+    faces its connectivity links to the face it was entered by, never
+    stepping back against a direction already taken
+    """
+    # frustum test of every chunk in the extent at once
+    shape = masks.shape
+    lows = (np.indices(shape).reshape(3, -1).T + low) * CHUNK_RADIUS - .5
+    in_view = frustum.intersects_boxes(lows, lows + CHUNK_RADIUS).reshape(shape)
+    sx, sy, sz = (c - lo for c, lo in zip(start, low))
+    order = _traverse(masks, in_view, drawable, _STEPS, sx, sy, sz, start_faces)
+    xs, ys, zs = np.unravel_index(order, shape)
+    return list(zip((xs + low[0]).tolist(), (ys + low[1]).tolist(), (zs + low[2]).tolist()))
@@ -9,15 +9,15 @@ from typing import cast
 import numpy as np
 import opensimplex  # type: ignore
 from blocks.blocks import AIR, GRASS, SAND
-from maths.blocks import (get_block_id_xyz, get_chunk_and_offsets,
-                          get_chunk_id, get_chunk_id_xyz, get_sphere_blocks)
-from maths.constants import CHUNK_AREA, CHUNK_RADIUS, CHUNK_SIZE
+from blocks.registry import REGISTRY
+from maths.blocks import get_sphere_blocks
+from maths.constants import CHUNK_RADIUS
 from maths.generators import xy_range, xyz_range
 from maths.rng import prob
 from maths.types import Location
 from tqdm import tqdm  # type: ignore
 
-from model.modelprotocol import ChunkSource, ModelProtocol  # type: ignore
+from model.modelprotocol import ArrayChunkSource, ModelProtocol  # type: ignore
 from model.worldgenconfig import WorldGenerationConfigProtocol
 
 
@@ -77,27 +77,38 @@ def generate_world(model: ModelProtocol, config: WorldGenerationConfigProtocol)
     height_map: dict[tuple[int, int], int] = {}
 
     for chunkloc in tqdm(xyz_range(chunkx, chunky, chunkz), "chunk pregen", total=chunkx * chunky * chunkz): # type: ignore
-        model.model[get_chunk_id(chunkloc)] = ChunkSource([air_tile for _ in range(CHUNK_SIZE)], []) # type: ignore
-
-    with tqdm(total=CHUNK_AREA * chunkx * chunkz, desc="generating blocks") as progress_bar:
-        for x, z in xy_range(chunkx * CHUNK_RADIUS, chunkz * CHUNK_RADIUS):
-            height = height_base + int(scale_noise_function_output * sum(noise[x][z] * mux for noise, mux in zip(noises, perlin_noise_poller_mux)))
-            for y in range(height):
-                tile = base_tile
-                if y > height - 4:
-                    tile = sub_terrainian_tile
-                if y == height - 1:
-                    tile = surface_tile
-                    height_map[((x, z))] = y
-                    surface_tiles.append((x, y, z))
-                if y < water_height:
-                    tile = base_tile
-                    if y == height - 1:
-                        surface_tiles.append((x, y, z))
-                cx, ox, cy, oy, cz, oz = get_chunk_and_offsets((x, y, z))
-                chunk = cast(ChunkSource, model.model[get_chunk_id_xyz(cx, cy, cz)]).blocks
-                chunk[get_block_id_xyz(ox, oy, oz)] = tile
-            progress_bar.update(1)
+        model.model[chunkloc] = ArrayChunkSource.filled(air_tile) # type: ignore
+
+    # column heights indexed [x, z]
+    heights = height_base + (scale_noise_function_output * sum(noise * mux for noise, mux in zip(noises, perlin_noise_poller_mux))).astype(int)
+
+    air_id, base_id = REGISTRY.id_of(air_tile), REGISTRY.id_of(base_tile)
+    sub_terrainian_id, surface_id = REGISTRY.id_of(sub_terrainian_tile), REGISTRY.id_of(surface_tile)
+    offsets = np.arange(CHUNK_RADIUS)
+
+    for cx, cy, cz in tqdm(xyz_range(chunkx, chunky, chunkz), "generating blocks", total=chunkx * chunky * chunkz): # type: ignore
+        # broadcast column heights against the chunk's y range, shape (x, y, z)
+        h = heights[cx * CHUNK_RADIUS:(cx + 1) * CHUNK_RADIUS, cz * CHUNK_RADIUS:(cz + 1) * CHUNK_RADIUS][:, None, :]
+        y = (cy * CHUNK_RADIUS + offsets)[None, :, None]
+        if cy * CHUNK_RADIUS >= h.max():
+            continue
+        chunk = cast(ArrayChunkSource, model.model[(cx, cy, cz)])
+        chunk.promote()[:] = np.select(
+            [y >= h, y < water_height, y == h - 1, y > h - 4],
+            [air_id, base_id, surface_id, sub_terrainian_id],
+            base_id
+            )
+        # solid rock chunks below the terrain go back to a single value
+        chunk.compact()
+
+    for x, z in xy_range(chunkx * CHUNK_RADIUS, chunkz * CHUNK_RADIUS):
+        y = int(heights[x, z]) - 1
+        if y < 0:
+            continue
+        height_map[(x, z)] = y
+        surface_tiles.append((x, y, z))
+        if y < water_height:
+            surface_tiles.append((x, y, z))
         
     #for chunkloc, chunk in chunkslist: # type: ignore
     #    model_chunk_id = get_chunk_id(chunkloc) # type: ignore
@@ -128,11 +139,11 @@ def generate_world(model: ModelProtocol, config: WorldGenerationConfigProtocol)
                 scaley=random.random() * 1.4 * scaler,
                 scalez=random.random() * 2.6 * scaler
                 ):
-            if model.get_block(spot) == SAND:
+            if model.get_block(spot) is SAND:
                 model.add_block(spot, target_block, defer=True)
     # tree gen
     for x, y, z in tqdm(surface_tiles, "generating trees"):
-        if prob(tree_feature_chance) and model.get_block((x, y, z)) == GRASS:
+        if prob(tree_feature_chance) and model.get_block((x, y, z)) is GRASS:
             oy = 0
             log = log_tile_provider()
             for oy in range(random.randint(3, 5)):
@@ -144,16 +155,19 @@ def generate_world(model: ModelProtocol, config: WorldGenerationConfigProtocol)
                         0.5 + random.randint(2, 4),
                         scalex=0.8, scalez=0.8
                         )):
-                if model.get_block(spot) == AIR:
+                if model.get_block(spot) is AIR:
                     leaves = leaves_tile_provider()
                     model.add_block(spot, leaves, defer=True)
     # grass / poppy / cornflower gen
     for x, y, z in tqdm(surface_tiles, "generating foliage"):
         if (
                     prob(foliage_feature_chance) 
-                and model.get_block((x, y, z)) == GRASS 
-                and model.get_block((x, y + 1, z)) == AIR):
+                and model.get_block((x, y, z)) is GRASS 
+                and model.get_block((x, y + 1, z)) is AIR):
             model.add_block((x, y + 1, z), foliage_tile_provider(), defer=True)
+    # features may have filled in (or broken up) uniform chunks
+    for chunk in model.model.values():
+        cast(ArrayChunkSource, chunk).compact()
     # rendering chunks
     #for chunkloc in tqdm(xyz_range(chunkx, chunky, chunkz), "updating chunks", total=chunkx * chunky * chunkz): # type: ignore
     #    model.update_chunk(chunkloc) # type: ignore
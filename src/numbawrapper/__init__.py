@@ -2,8 +2,18 @@
 
 try:
     from numba import njit as _njit  # type: ignore
-    njit = lambda f: _njit(cache=True)(f) # type: ignore
+    HAS_NUMBA = True
+
+    def njit(f=None, **kwargs):
+        """numba.njit with cache=True
+        usable bare (@njit) or with extra options (@njit(nogil=True))"""
+        if f is None:
+            return lambda g: _njit(cache=True, **kwargs)(g)
+        return _njit(cache=True, **kwargs)(f)
 except ImportError:
-    def njit(f, *args, **kwargs):
-        return f
+    HAS_NUMBA = False
 
+    def njit(f=None, *args, **kwargs):
+        if f is None:
+            return lambda g: g
+        return f
@@ -4,6 +4,12 @@ in vec2 UV;
 in vec4 COLOUR;
 in vec3 NORMAL;
 in vec3 NORMAL_CS;
+#ifdef GREEDY_MESHING
+in vec2 TILE;
+
+// size of one tile in the texture atlas (see maths.bufferdomain.tex_coord)
+const float tile_size = 1. / 16.;
+#endif
 //in vec3 LIGHTDIRECTION_CS;
 
 out vec4 colour_frag;
@@ -19,5 +25,11 @@ void main()
 
     float cos_theta = clamp(dot(n, l), 0.8, 1);
     vec4 colour = vec4(COLOUR.xyz * cos_theta, 1);
-    colour_frag = colour * vec4(texture(texture_sampler, UV).rgba);
+#ifdef GREEDY_MESHING
+    // repeat the tile across merged faces
+    vec2 uv = TILE + fract(UV) * tile_size;
+#else
+    vec2 uv = UV;
+#endif
+    colour_frag = colour * vec4(texture(texture_sampler, uv).rgba);
 }
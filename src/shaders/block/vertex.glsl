@@ -1,12 +1,33 @@
 #version 330 core
+#ifdef PACKED_VERTICES
+// cell offset within the chunk, face id * 4 + corner (see model.mesher.MeshData.packed)
+layout(location = 0) in vec4 _corner;
+// tex coords in atlas tiles
+layout(location = 1) in vec2 _tile_uv;
+
+const vec3 face_offsets[FACE_CORNERS] = vec3[FACE_CORNERS](FACE_OFFSETS);
+const vec4 face_colours[FACE_CORNERS] = vec4[FACE_CORNERS](FACE_COLOURS);
+const vec3 face_normals[FACES] = vec3[FACES](FACE_NORMALS);
+
+// world position of the chunk's first cell
+uniform vec3 chunk_origin;
+#else
 layout(location = 0) in vec3 _vertex;
 layout(location = 3) in vec4 _colour;
 layout(location = 8) in vec2 _uv;
 layout(location = 2) in vec3 _normal;
+#endif
+#ifdef GREEDY_MESHING
+// atlas origin of the face's texture tile; _uv counts tiles across the quad
+layout(location = 1) in vec2 _tile;
+#endif
 
 out vec2 UV;
 out vec4 COLOUR;
 out vec3 NORMAL;
+#ifdef GREEDY_MESHING
+out vec2 TILE;
+#endif
 
 uniform mat4 mvp;
 uniform mat4 m;
@@ -16,9 +37,21 @@ uniform mat4 p;
 
 void main()
 {
+#ifdef PACKED_VERTICES
+    int corner = int(_corner.w);
+    vec4 pos = vec4(chunk_origin + _corner.xyz + face_offsets[corner], 1.0);
+    gl_Position = mvp * pos;
+    UV = _tile_uv / ATLAS_TILES;
+    COLOUR = face_colours[corner];
+    NORMAL = face_normals[corner / 4];
+#else
     vec4 pos = vec4(_vertex.xyz, 1.0);
     gl_Position = mvp * pos;
     UV = _uv;
     COLOUR = _colour;
     NORMAL = _normal;
+#endif
+#ifdef GREEDY_MESHING
+    TILE = _tile;
+#endif
 }
\ No newline at end of file
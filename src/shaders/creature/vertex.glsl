@@ -1,5 +1,7 @@
 #version 330 core
 layout(location = 0) in vec3 _vertex;
+// per instance (see display.creatures)
+layout(location = 1) in vec3 _offset;
 layout(location = 3) in vec4 _colour;
 layout(location = 8) in vec2 _uv;
 
@@ -10,7 +12,7 @@ uniform mat4 mvp;
 
 void main()
 {
-    gl_Position = mvp * vec4(_vertex.xyz, 1.);
+    gl_Position = mvp * vec4(_vertex.xyz + _offset, 1.);
     UV = _uv;
     COLOUR = _colour;
-}
\ No newline at end of file
+}
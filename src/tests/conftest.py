@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+
+import pyglet
+import pytest
+
+# run from src, which holds the packages and the settings files they read
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(SRC)
+sys.path.insert(0, SRC)
+# a gl context without a display for the vertex buffers
+pyglet.options["headless"] = True
+
+from maths.types import ChunkLocation  # noqa: E402
+from model import Model  # noqa: E402
+from model.worldgenconfig import DefaultWorldGenerationConfig  # noqa: E402
+
+
+class SmallWorldConfig(DefaultWorldGenerationConfig):
+    dims = (2, 2)
+
+
+@pytest.fixture(scope="session")
+def model() -> Model:
+    "a small generated world, not meshed"
+    random.seed(0)
+    model = Model()
+    model.generate(SmallWorldConfig())
+    return model
+
+
+@pytest.fixture(scope="session")
+def mixed_chunks(model: Model) -> list[ChunkLocation]:
+    "locations of the chunks holding more than one block type"
+    return [chunkloc for chunkloc, chunk in model.model.items() if chunk.uniform is None]
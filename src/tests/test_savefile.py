@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from model import savefile
+from model.savefile import RETIRED_SUFFIX, STAGING_SUFFIX, WorldSave, recover_save
+
+
+def saved_blocks(path, chunklocs):
+    save = WorldSave(path)
+    try:
+        return [save.load_chunk(chunkloc).as_array() for chunkloc in chunklocs]
+    finally:
+        save.close()
+
+def test_create_replaces_save(model, mixed_chunks, tmp_path):
+    path = str(tmp_path / "live")
+    first, second = mixed_chunks[:2]
+    WorldSave.create(path, [(first, model.model[first])], model.dims)[0].close()
+    WorldSave.create(path, [(second, model.model[second])], model.dims)[0].close()
+    save = WorldSave(path)
+    assert save.chunk_locations() == [second]
+    save.close()
+    assert sorted(os.listdir(tmp_path)) == ["live"]
+
+def test_crash_during_create_keeps_old_save(model, mixed_chunks, tmp_path, monkeypatch):
+    "a whole save that fails before it is swapped in leaves the old save as it was"
+    path = str(tmp_path / "live")
+    first, second = mixed_chunks[:2]
+    WorldSave.create(path, [(first, model.model[first])], model.dims)[0].close()
+    old = saved_blocks(path, [first])
+
+    def crash(*args):
+        raise OSError("crashed")
+    monkeypatch.setattr(savefile, "_write_world", crash)
+    with pytest.raises(OSError):
+        WorldSave.create(path, [(first, model.model[second])], model.dims)
+    monkeypatch.undo()
+
+    assert os.path.isdir(path + STAGING_SUFFIX)
+    assert recover_save(path)
+    assert sorted(os.listdir(tmp_path)) == ["live"]
+    assert all(np.array_equal(a, b) for a, b in zip(old, saved_blocks(path, [first])))
+
+def test_recover_between_renames(model, mixed_chunks, tmp_path):
+    "a crash after the old save was moved aside finishes the staged save"
+    path = str(tmp_path / "live")
+    first, second = mixed_chunks[:2]
+    WorldSave.create(path, [(first, model.model[first])], model.dims)[0].close()
+    WorldSave.create(path + STAGING_SUFFIX, [(second, model.model[second])], model.dims)[0].close()
+    os.replace(path, path + RETIRED_SUFFIX)
+    assert recover_save(path)
+    assert sorted(os.listdir(tmp_path)) == ["live"]
+    assert np.array_equal(saved_blocks(path, [second])[0], model.model[second].as_array())
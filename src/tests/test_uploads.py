@@ -0,0 +1,46 @@
+import time
+
+from model.mesher import build_chunk_mesh
+from model.uploads import MeshUploads
+
+# bytes per vertex of the default format's interleaved buffer and of the
+# packed format (see test_vertexlists)
+DEFAULT_STRIDE = 44
+PACKED_STRIDE = 6
+
+
+def test_drain_spends_vertex_bytes(model, mixed_chunks):
+    "the upload budget is charged the size of the vertex data uploaded"
+    stride = PACKED_STRIDE if model.packed_vertices else DEFAULT_STRIDE
+    # bytes spent and actual vertex data size of every upload, by drain call
+    calls: list[list[tuple[int, int]]] = []
+
+    def build(chunkloc):
+        return build_chunk_mesh(model, chunkloc, model.dims, False)
+
+    def upload(chunkloc, mesh, fluid_mesh):
+        spent = model.display_chunk(chunkloc, mesh, fluid_mesh)
+        calls[-1].append((spent, mesh.count * stride + fluid_mesh.count * DEFAULT_STRIDE))
+        return spent
+
+    largest = max(mesh.count * stride + fluid_mesh.count * DEFAULT_STRIDE
+                  for mesh, fluid_mesh in map(build, mixed_chunks))
+    budget = 2 * largest
+    uploads = MeshUploads(build, upload, budget)
+    uploads.submit(mixed_chunks)
+    # let the builds finish so the first drain has more ready than its budget
+    time.sleep(1)
+    deadline = time.monotonic() + 60
+    while len(uploads) and time.monotonic() < deadline:
+        calls.append([])
+        uploads.drain()
+    assert not len(uploads)
+
+    spent = [upload for call in calls for upload in call]
+    assert len(spent) == len(mixed_chunks)
+    assert all(charged == actual for charged, actual in spent)
+    for call in calls:
+        # every upload but the last of a call started within the budget
+        assert sum(actual for _, actual in call[:-1]) < budget
+    # and the budget fits at least two chunks
+    assert len(calls[0]) >= 2
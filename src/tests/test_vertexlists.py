@@ -0,0 +1,27 @@
+from pyglet.graphics import Batch, Group  # type: ignore
+
+from model.mesher import build_chunk_mesh
+from model.vertexlists import add_mesh, vertex_list_bytes
+
+# v3f t2f c4B n3f: 36 bytes, in one interleaved buffer whose stride pyglet 1.5
+# pads to 44 (it aligns the stride to the largest attribute, 12 bytes)
+DEFAULT_ATTRIBUTE_BYTES = 12 + 8 + 4 + 12
+DEFAULT_STRIDE = 44
+# corners 4B and uvs 2B, each in its own buffer
+PACKED_STRIDE = 4 + 2
+
+
+def test_default_format_bytes(model, mixed_chunks):
+    mesh, _ = build_chunk_mesh(model, mixed_chunks[0], model.dims, False)
+    assert mesh.count > 0
+    vertex_list = add_mesh(Batch(), Group(), mesh)
+    (buffer, attributes), = vertex_list.domain.buffer_attributes
+    assert sum(attribute.size for attribute in attributes) == DEFAULT_ATTRIBUTE_BYTES
+    assert buffer.element_size == DEFAULT_STRIDE
+    # the interleaved attributes are counted once, not twice
+    assert vertex_list_bytes(vertex_list) == mesh.count * DEFAULT_STRIDE
+
+def test_packed_format_bytes(model, mixed_chunks):
+    mesh, _ = build_chunk_mesh(model, mixed_chunks[0], model.dims, False)
+    vertex_list = add_mesh(Batch(), Group(), mesh, packed=True)
+    assert vertex_list_bytes(vertex_list) == mesh.count * PACKED_STRIDE